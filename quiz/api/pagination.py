@@ -0,0 +1,100 @@
+from base64 import b64decode, b64encode
+
+from django.db.models import Q
+from django.http import Http404
+from rest_framework import pagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class SitelinksCursorPagination(pagination.BasePagination):
+    """
+    Keyset pagination on ``(-sitelinks, id)``.
+    Unlike offset pagination every page costs one index range scan,
+    no matter how deep the client pages.
+    Also used by the async views, which get plain Django requests.
+    """
+
+    page_size = 10
+    max_page_size = 1000
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering = ("-sitelinks", "id")
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def decode_cursor(self, request) -> tuple[int, int] | None:
+        encoded = request.GET.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            sitelinks, pk = b64decode(encoded.encode("ascii")).decode().split(":")
+            return int(sitelinks), int(pk)
+        except (TypeError, ValueError):
+            raise Http404("Invalid cursor")
+
+    def encode_cursor(self, sitelinks: int, pk: int) -> str:
+        return b64encode(f"{sitelinks}:{pk}".encode()).decode("ascii")
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            sitelinks, pk = cursor
+            queryset = queryset.filter(
+                Q(sitelinks__lt=sitelinks) | Q(sitelinks=sitelinks, id__gt=pk)
+            )
+
+        # Fetch one more item to find out if there is a next page
+        return queryset.order_by(*self.ordering)[: self.page_size_value + 1]
+
+    def set_page(self, page: list) -> list:
+        self.has_next = len(page) > self.page_size_value
+        page = page[: self.page_size_value]
+
+        # Items are either model instances or ``values()`` dicts
+        self.next_cursor = None
+        if self.has_next:
+            last = page[-1]
+            if isinstance(last, dict):
+                self.next_cursor = self.encode_cursor(last["sitelinks"], last["id"])
+            else:
+                self.next_cursor = self.encode_cursor(last.sitelinks, last.id)
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self.set_page(
+            [item async for item in self.get_page_queryset(queryset, request)]
+        )
+
+    def get_next_link(self) -> str | None:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor,
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from movies.models import Movie, AlternativeMovieTitle
 
 
-class AlternativeMovieTitleSerializer(serializers.HyperlinkedModelSerializer):
+class AlternativeMovieTitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = AlternativeMovieTitle
@@ -14,7 +14,7 @@ class AlternativeMovieTitleSerializer(serializers.HyperlinkedModelSerializer):
         ]
 
 
-class MovieSerializer(serializers.HyperlinkedModelSerializer):
+class MovieSerializer(serializers.ModelSerializer):
 
     alternative_titles = AlternativeMovieTitleSerializer(many=True, read_only=True)
 
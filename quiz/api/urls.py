@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import MovieViewSet
+from .views import AsyncMovieListView, AsyncQuestionView, MovieViewSet, QuestionView
 
 router = routers.DefaultRouter()
 router.register(r"movies", MovieViewSet)
@@ -10,5 +11,14 @@ router.register(r"movies", MovieViewSet)
 # Additionally, we include login URLs for the browsable API.
 urlpatterns = [
     path("", include(router.urls)),
+    path("questions/", QuestionView.as_view(), name="questions"),
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
 ]
+
+# DRF views are synchronous, ASGI deployments use async versions
+# of the hot endpoints instead (matched before the router)
+if settings.ASYNC_VIEWS:
+    urlpatterns = [
+        path("movies/", AsyncMovieListView.as_view(), name="movie-list"),
+        path("questions/", AsyncQuestionView.as_view(), name="questions"),
+    ] + urlpatterns
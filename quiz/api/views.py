@@ -1,19 +1,336 @@
-from rest_framework import permissions, viewsets
+import hashlib
+import json
+import random
 
-from movies.models import Movie
+from asgiref.sync import sync_to_async
+from django import views
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from rest_framework import exceptions, permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from movies import cache
+from movies.languages import get_language_codes
+from movies.models import (
+    AlternativeMovieTitle,
+    Movie,
+    QuizQuestion,
+    QuizQuestionLanguage,
+)
+from movies.sampling import is_popular_mode
+from movies.tasks.export import aiter_blocks, iter_gzip, iter_ndjson
+from .pagination import SitelinksCursorPagination
 from .serializers import MovieSerializer
 
+# Maximum number of questions per request
+MAX_QUESTION_COUNT = 100
+DEFAULT_QUESTION_COUNT = 20
+
+# Seconds clients and proxies may reuse a deck of questions
+QUESTION_CACHE_MAX_AGE = 60
+
+# Columns needed by ``MovieSerializer`` and ``AlternativeMovieTitleSerializer``
+MOVIE_FIELDS = ["id", "english_title", "sitelinks"]
+ALTERNATIVE_TITLE_FIELDS = [
+    "movie",
+    "title",
+    "language_code",
+    "translated_title",
+    "translation_difference_ratio",
+]
+QUESTION_FIELDS = [
+    "position",
+    "titles",
+    "movie__wikidata_id",
+    "movie__english_title",
+    "movie__description",
+]
+
+
+def is_lean(request) -> bool:
+    return request.GET.get("lean") in ("true", "1")
+
+
+def group_titles(titles) -> dict[int, list[dict]]:
+    titles_by_movie = {}
+    for title in titles:
+        titles_by_movie.setdefault(title.pop("movie"), []).append(title)
+    return titles_by_movie
+
+
+def get_page_data(pagination, page: list[dict], titles: list[dict]) -> dict:
+    """
+    Build a list response from ``values()`` dicts of movies and their titles
+    """
+    titles_by_movie = group_titles(titles)
+    for movie in page:
+        movie["alternative_titles"] = titles_by_movie.get(movie.pop("id"), [])
+    return {"next": pagination.get_next_link(), "results": page}
+
+
+def get_question_count(request) -> int:
+    try:
+        count = int(request.GET.get("count", DEFAULT_QUESTION_COUNT))
+    except ValueError:
+        count = DEFAULT_QUESTION_COUNT
+    return max(1, min(count, MAX_QUESTION_COUNT))
+
+
+def get_rng(request) -> random.Random:
+    seed = request.GET.get("seed")
+    return random.Random(seed) if seed is not None else random.Random()
+
+
+def build_questions(
+    rows: list[dict], positions: list[int], rng, language_codes=None
+) -> list[dict]:
+    """
+    Turn ``QuizQuestion.values(*QUESTION_FIELDS)`` rows into the API payload
+    """
+    order = {position: i for i, position in enumerate(positions)}
+    rows = sorted(rows, key=lambda row: order[row["position"]])
+
+    return [
+        {
+            "wikidata_id": row["movie__wikidata_id"],
+            "english_title": row["movie__english_title"],
+            "description": row["movie__description"],
+            "alternative_titles": [
+                {
+                    "title": title["title"],
+                    "language_code": title["language_code"],
+                    "translated_title": title["translated_title"],
+                }
+                for title in QuizQuestion.sample_titles(
+                    row["titles"], rng, language_codes
+                )
+            ],
+        }
+        for row in rows
+    ]
+
+
+def question_response(request, questions: list[dict], response_class):
+    """
+    Wrap ``questions`` into a response with ETag and Cache-Control headers
+    """
+    etag = '"{}"'.format(
+        hashlib.md5(
+            json.dumps(questions, sort_keys=True).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+    )
+    response = get_conditional_response(request, etag=etag) or response_class(
+        questions
+    )
+    response["ETag"] = etag
+    if "seed" in request.GET:
+        patch_cache_control(response, public=True, max_age=QUESTION_CACHE_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, max_age=QUESTION_CACHE_MAX_AGE)
+    return response
+
 
 class MovieViewSet(viewsets.ReadOnlyModelViewSet):
-    # TODO: Optimize queryset and remove slice operator
+    """
+    Movies ordered by popularity.
+    ``?lean=true`` skips model instances and serializers
+    and builds the list response straight from ``values()``.
+    """
+
     queryset = (
-        Movie.objects.all()
-        .order_by("-sitelinks")
-        .prefetch_related("alternative_titles")
-    )[:10]
+        Movie.objects.only(*MOVIE_FIELDS)
+        .order_by("-sitelinks", "id")
+        .prefetch_related(
+            Prefetch(
+                "alternative_titles",
+                queryset=AlternativeMovieTitle.objects.only(*ALTERNATIVE_TITLE_FIELDS),
+            )
+        )
+    )
     serializer_class = MovieSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SitelinksCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        # Pages are cached until a movie or title changes
+        data = cache.get_or_set(
+            f"movies:{request.build_absolute_uri()}",
+            lambda: self.get_page_data(request, *args, **kwargs),
+        )
+        return Response(data)
+
+    def get_page_data(self, request, *args, **kwargs) -> dict:
+        if is_lean(request):
+            return self.get_lean_page_data()
+
+        data = super().list(request, *args, **kwargs).data
+        # Plain containers for the cache (DRF's ReturnList keeps the serializer)
+        return {"next": data["next"], "results": list(data["results"])}
+
+    def get_lean_page_data(self) -> dict:
+        page = self.paginate_queryset(Movie.objects.values(*MOVIE_FIELDS))
+        titles = AlternativeMovieTitle.objects.filter(
+            movie_id__in=[movie["id"] for movie in page]
+        ).values(*ALTERNATIVE_TITLE_FIELDS)
+        return get_page_data(self.paginator, page, list(titles))
+
+    @action(detail=False)
+    def export(self, request):
+        """
+        Stream the whole catalogue as NDJSON,
+        gzip-compressed if the client accepts it
+        """
+        compress = "gzip" in request.headers.get("Accept-Encoding", "")
+
+        data = iter_ndjson()
+        if compress:
+            data = iter_gzip(data)
+        if isinstance(request._request, ASGIRequest):
+            data = aiter_blocks(data)
+
+        response = StreamingHttpResponse(
+            data, content_type="application/x-ndjson; charset=utf-8"
+        )
+        if compress:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ["Accept-Encoding"])
+        response["Content-Disposition"] = 'attachment; filename="movies.ndjson"'
+        return response
+
+
+class QuestionView(APIView):
+    """
+    Return a deck of ready-to-play questions: ``?count=20``.
+    ``?mode=popular`` picks movies proportionally to their popularity,
+    ``?lang=de,fr`` or ``?lang=asian`` limits the deck to these languages.
+    Passing ``?seed=...`` returns the same deck for the same seed,
+    which makes the response cacheable by shared proxies.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        rng = get_rng(request)
+        count = get_question_count(request)
+        language_codes = get_language_codes(request)
+        if language_codes is not None:
+            positions = QuizQuestionLanguage.objects.random_positions(
+                language_codes, count, rng
+            )
+        elif is_popular_mode(request):
+            positions = QuizQuestion.objects.weighted_random_positions(count, rng)
+        else:
+            positions = QuizQuestion.objects.random_positions(count, rng)
+        rows = QuizQuestion.objects.filter(position__in=positions).values(
+            *QUESTION_FIELDS
+        )
+        questions = build_questions(list(rows), positions, rng, language_codes)
+        return question_response(request, questions, Response)
+
+
+class AsyncMovieListView(views.View):
+    """
+    Async version of the lean ``MovieViewSet`` list for ASGI deployments
+    """
+
+    # Same access rules as ``MovieViewSet`` (session and HTTP Basic by default)
+    authentication_classes = MovieViewSet.authentication_classes
+    permission_classes = MovieViewSet.permission_classes
+
+    def check_access(self, request) -> JsonResponse | None:
+        """
+        Run DRF's authentication and permission checks,
+        return the error response if they fail
+        """
+        authenticators = [auth() for auth in self.authentication_classes]
+        drf_request = Request(request, authenticators=authenticators)
+        try:
+            for permission in self.permission_classes:
+                if permission().has_permission(drf_request, self):
+                    continue
+                if authenticators and not drf_request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+        except exceptions.APIException as exc:
+            response = JsonResponse({"detail": exc.detail}, status=exc.status_code)
+            if exc.status_code == 401:
+                # Like ``APIView``: 401 only if the first authenticator has a scheme
+                authenticate_header = (
+                    authenticators[0].authenticate_header(drf_request)
+                    if authenticators
+                    else None
+                )
+                if authenticate_header:
+                    response["WWW-Authenticate"] = authenticate_header
+                else:
+                    response.status_code = 403
+            return response
+        return None
+
+    async def get(self, request):
+        # Authentication classes may query the database
+        error_response = await sync_to_async(self.check_access)(request)
+        if error_response is not None:
+            return error_response
+
+        data = await cache.aget_or_set(
+            f"movies:{request.build_absolute_uri()}",
+            lambda: self.get_page_data(request),
+        )
+        return JsonResponse(data)
+
+    async def get_page_data(self, request) -> dict:
+        pagination = SitelinksCursorPagination()
+        page = await pagination.apaginate_queryset(
+            Movie.objects.values(*MOVIE_FIELDS), request
+        )
+        titles = [
+            title
+            async for title in AlternativeMovieTitle.objects.filter(
+                movie_id__in=[movie["id"] for movie in page]
+            ).values(*ALTERNATIVE_TITLE_FIELDS)
+        ]
+        return get_page_data(pagination, page, titles)
+
 
+class AsyncQuestionView(views.View):
+    """
+    Async version of ``QuestionView`` for ASGI deployments
+    """
 
-class QuestionView:
-    pass
+    async def get(self, request):
+        rng = get_rng(request)
+        count = get_question_count(request)
+        language_codes = get_language_codes(request)
+        if language_codes is not None:
+            positions = await QuizQuestionLanguage.objects.arandom_positions(
+                language_codes, count, rng
+            )
+        elif is_popular_mode(request):
+            positions = await QuizQuestion.objects.aweighted_random_positions(
+                count, rng
+            )
+        else:
+            positions = await QuizQuestion.objects.arandom_positions(count, rng)
+        rows = [
+            row
+            async for row in QuizQuestion.objects.filter(
+                position__in=positions
+            ).values(*QUESTION_FIELDS)
+        ]
+        questions = build_questions(rows, positions, rng, language_codes)
+        return question_response(
+            request,
+            questions,
+            lambda data: JsonResponse(data, safe=False),
+        )
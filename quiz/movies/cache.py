@@ -0,0 +1,161 @@
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Cache keys contain a generation number,
+# invalidating the cache means incrementing the generation.
+# Stale entries are never read again and get evicted by the backend.
+GENERATION_KEY = "quiz-cache:generation"
+
+# Shared hit/miss counters, see ``get_stats``
+HITS_KEY = "quiz-cache:hits"
+MISSES_KEY = "quiz-cache:misses"
+
+# Hits and misses are counted per process and added to the shared counters
+# after this many requests or seconds, not with a cache write per request
+STATS_FLUSH_COUNT = 100
+STATS_FLUSH_INTERVAL = 10.0
+
+local_counts = {HITS_KEY: 0, MISSES_KEY: 0}
+last_flush = time.monotonic()
+counts_lock = threading.Lock()
+
+
+def new_generation() -> int:
+    # The backend may evict the generation key (e.g. the file cache culls
+    # random entries), starting again at 1 would revive invalidated entries
+    return time.time_ns()
+
+
+def get_generation() -> int:
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, new_generation(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def make_key(name: str) -> str:
+    return f"quiz-cache:{get_generation()}:{name}"
+
+
+def count(key: str) -> dict[str, int] | None:
+    """
+    Count a hit or miss in this process,
+    return the counts once they should be added to the shared counters
+    """
+    global last_flush
+    with counts_lock:
+        local_counts[key] += 1
+        now = time.monotonic()
+        if (
+            sum(local_counts.values()) < STATS_FLUSH_COUNT
+            and now - last_flush < STATS_FLUSH_INTERVAL
+        ):
+            return None
+        counts = {key: value for key, value in local_counts.items() if value}
+        local_counts.update(dict.fromkeys(local_counts, 0))
+        last_flush = now
+        return counts
+
+
+def increment(key: str, delta: int) -> None:
+    # Missing (or evicted) keys are created
+    if not cache.add(key, delta, timeout=None):
+        cache.incr(key, delta)
+
+
+def record(key: str) -> None:
+    for counter_key, delta in (count(key) or {}).items():
+        increment(counter_key, delta)
+
+
+def get_or_set(name: str, default: Callable[[], Any]) -> Any:
+    """
+    Return the cached value of ``name``
+    or compute it with ``default()`` and cache it.
+    ``None`` values are not cached.
+    """
+    key = make_key(name)
+    value = cache.get(key)
+    if value is not None:
+        record(HITS_KEY)
+        return value
+
+    record(MISSES_KEY)
+    value = default()
+    if value is not None:
+        cache.set(key, value, settings.QUIZ_CACHE_TIMEOUT)
+    return value
+
+
+async def aget_generation() -> int:
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, new_generation(), timeout=None)
+        generation = await cache.aget(GENERATION_KEY)
+    return generation
+
+
+async def aincrement(key: str, delta: int) -> None:
+    if not await cache.aadd(key, delta, timeout=None):
+        await cache.aincr(key, delta)
+
+
+async def arecord(key: str) -> None:
+    for counter_key, delta in (count(key) or {}).items():
+        await aincrement(counter_key, delta)
+
+
+async def aget_or_set(name: str, default: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Async version of ``get_or_set``, ``default`` is a coroutine function
+    """
+    key = f"quiz-cache:{await aget_generation()}:{name}"
+    value = await cache.aget(key)
+    if value is not None:
+        await arecord(HITS_KEY)
+        return value
+
+    await arecord(MISSES_KEY)
+    value = await default()
+    if value is not None:
+        await cache.aset(key, value, settings.QUIZ_CACHE_TIMEOUT)
+    return value
+
+
+def invalidate() -> None:
+    """
+    Drop all cached questions and API pages
+    """
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, new_generation(), timeout=None)
+
+
+def get_stats() -> dict:
+    """
+    Hits and misses since the counters were last reset
+    (without the last few requests each process has not added yet)
+    """
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+
+def reset_stats() -> None:
+    global last_flush
+    with counts_lock:
+        local_counts.update(dict.fromkeys(local_counts, 0))
+        last_flush = time.monotonic()
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,75 @@
+# Map language codes to translation models
+LANGUAGE_MAP = {
+    "de": "de",
+    "fr": "fr",
+    "es": "es",
+    "da": "da",
+    "ru": "ru",
+    "cs": "cs",
+    "it": "it",
+    "sv": "sv",
+    "ro": "ROMANCE",
+    "ja": "ja",
+    "fi": "fi",
+    "ka": "ka",
+    "hi": "hi",
+    "no": "da",
+    "tr": "tr",
+    "ko": "ko",
+    "hu": "hu",
+    "be": "mul",
+    "zh": "zh",
+    "ar": "ar",
+    "pl": "pl",
+    "nl": "nl",
+    "th": "th",
+    "sk": "sk",
+    "is": "is",
+    "nb": "gmq",
+    "uk": "uk",
+    "id": "id",
+    "lv": "lv",
+    "sq": "sq",
+    "sw": "mul",
+    "vi": "vi",
+    "el": "grk",
+    "et": "et",
+    "to": "to",
+}
+
+# Language groups for language-scoped quizzes (e.g. ``?lang=asian``),
+# limited to the languages that get translated
+LANGUAGE_GROUPS = {
+    name: [code for code in codes if code in LANGUAGE_MAP]
+    for name, codes in {
+        "all": LANGUAGE_MAP.keys(),
+        "germanic": ["de", "nl", "da", "no", "nb", "sv", "is"],
+        "nordic": ["da", "no", "nb", "sv", "is", "fi"],
+        "romance": ["fr", "es", "it", "ro"],
+        "slavic": ["ru", "cs", "pl", "sk", "uk", "be"],
+        "asian": ["ja", "ko", "zh", "th", "vi", "hi", "id"],
+    }.items()
+}
+
+
+def parse_language_codes(value: str) -> list[str]:
+    """
+    Turn a comma-separated list of language codes and group names
+    (e.g. "de,fr" or "asian,de") into a list of known language codes
+    """
+    codes = []
+    for item in value.split(","):
+        item = item.strip()
+        if item in LANGUAGE_GROUPS:
+            codes += LANGUAGE_GROUPS[item]
+        elif item in LANGUAGE_MAP:
+            codes.append(item)
+    return list(dict.fromkeys(codes))
+
+
+def get_language_codes(request) -> list[str] | None:
+    """
+    ``?lang=de,fr`` or ``?lang=asian`` limits the quiz to these languages
+    """
+    value = request.GET.get("lang")
+    return None if value is None else parse_language_codes(value)
@@ -0,0 +1,215 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from movies import cache
+from movies.languages import LANGUAGE_GROUPS, LANGUAGE_MAP
+from movies.models import (
+    AlternativeMovieTitle,
+    Movie,
+    QuizQuestion,
+    QuizQuestionLanguage,
+)
+
+# The benchmark must not fill (or read from) the cache shared with the site
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+PAGE_SIZES = [10, 100, 1000]
+
+# Share of untranslated titles and of movies without details
+UNTRANSLATED_SHARE = 0.05
+INCOMPLETE_EVERY = 10
+
+
+def measure(func, repeat: int) -> float:
+    """
+    Average seconds per call of ``func``
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds a synthetic dataset in a temporary test database and reports "
+        "query plans without and with the indexes, the movie list throughput "
+        "and the time of a language-scoped question draw"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movies", type=int, default=20000)
+        parser.add_argument("--titles-per-movie", type=int, default=5)
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Runs per measurement"
+        )
+
+    def handle(self, *args, **options):
+        # Never touch the configured database
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with override_settings(
+                CACHES=LOCMEM_CACHES, DEBUG=False, ALLOWED_HOSTS=["testserver"]
+            ):
+                self.create_dataset(options["movies"], options["titles_per_movie"])
+                self.benchmark_query_plans(options["repeat"])
+                self.benchmark_movie_list(options["repeat"])
+                self.benchmark_language_draws(options["repeat"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def create_dataset(self, movie_count: int, titles_per_movie: int) -> None:
+        start = time.perf_counter()
+        rng = random.Random(1)
+        Movie.objects.bulk_create(
+            (
+                Movie(
+                    wikidata_id=f"Q{i}",
+                    english_title="" if i % INCOMPLETE_EVERY == 0 else f"Movie {i}",
+                    sitelinks=rng.randint(0, 300),
+                )
+                for i in range(movie_count)
+            ),
+            batch_size=5000,
+        )
+
+        language_codes = list(LANGUAGE_MAP)
+        titles_per_movie = min(titles_per_movie, len(language_codes))
+        AlternativeMovieTitle.objects.bulk_create(
+            (
+                AlternativeMovieTitle(
+                    movie_id=movie_id,
+                    language_code=code,
+                    title=f"Title {movie_id} {code}",
+                    translated_title=(
+                        "" if rng.random() < UNTRANSLATED_SHARE else "Translation"
+                    ),
+                    translation_difference_ratio=round(rng.random(), 3),
+                )
+                for movie_id in Movie.objects.exclude(english_title="").values_list(
+                    "id", flat=True
+                )
+                for code in rng.sample(language_codes, titles_per_movie)
+            ),
+            batch_size=5000,
+        )
+        QuizQuestion.objects.rebuild()
+
+        print(
+            f"Dataset: {Movie.objects.count()} movies, "
+            f"{AlternativeMovieTitle.objects.count()} titles, "
+            f"{QuizQuestion.objects.count()} questions "
+            f"({time.perf_counter() - start:.1f}s)"
+        )
+
+    def get_plan_queries(self) -> list:
+        """
+        ``(model, index name, queryset)`` of the queries the indexes are made for
+        """
+        titles = AlternativeMovieTitle.objects.values_list("id", flat=True)
+        return [
+            (
+                Movie,
+                "movie_sitelinks_idx",
+                Movie.objects.order_by("-sitelinks", "id").values_list("id")[:10],
+            ),
+            (
+                Movie,
+                "movie_incomplete_idx",
+                Movie.objects.filter(english_title="", lastrevid=0).values_list(
+                    "id"
+                )[:50],
+            ),
+            (
+                AlternativeMovieTitle,
+                "title_ratio_idx",
+                QuizQuestion.objects.eligible_titles().values_list("movie_id"),
+            ),
+            (
+                AlternativeMovieTitle,
+                "title_language_idx",
+                titles.filter(language_code="ja").order_by("-id")[:100],
+            ),
+            (
+                AlternativeMovieTitle,
+                "title_untranslated_idx",
+                titles.filter(translated_title="", language_code__in=["de", "fr"]),
+            ),
+        ]
+
+    def explain(self, queryset, repeat: int) -> tuple[float, str]:
+        seconds = measure(lambda: list(queryset.all()), repeat)
+        return seconds, " / ".join(queryset.explain().splitlines())
+
+    def benchmark_query_plans(self, repeat: int) -> None:
+        print("\nQuery plans without -> with index")
+        for model, index_name, queryset in self.get_plan_queries():
+            index = next(i for i in model._meta.indexes if i.name == index_name)
+            with connection.schema_editor() as editor:
+                editor.remove_index(model, index)
+            before, before_plan = self.explain(queryset, repeat)
+            with connection.schema_editor() as editor:
+                editor.add_index(model, index)
+            after, after_plan = self.explain(queryset, repeat)
+
+            print(f"{index_name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms")
+            print(f"  without: {before_plan}")
+            print(f"  with:    {after_plan}")
+
+    def benchmark_movie_list(self, repeat: int) -> None:
+        client = Client()
+        client.force_login(get_user_model().objects.create_user("benchmark"))
+
+        print("\nMovie list throughput (/api/movies/, uncached pages)")
+        for page_size in PAGE_SIZES:
+            for lean in (False, True):
+                first_url = f"/api/movies/?page_size={page_size}"
+                if lean:
+                    first_url += "&lean=true"
+
+                # Walk through the pages, starting over at the end
+                url = first_url
+                seconds = 0.0
+                for _ in range(repeat):
+                    cache.invalidate()
+                    start = time.perf_counter()
+                    url = client.get(url).json()["next"] or first_url
+                    seconds += time.perf_counter() - start
+
+                print(
+                    f"page_size={page_size:5d} lean={lean!s:5s} "
+                    f"{repeat * page_size / seconds:9.0f} movies/s "
+                    f"{seconds / repeat * 1000:7.1f} ms/page"
+                )
+
+    def benchmark_language_draws(self, repeat: int) -> None:
+        print("\nLanguage-scoped draw: language pools vs order_by('?')")
+        for name in ["de", "asian", "all"]:
+            language_codes = LANGUAGE_GROUPS.get(name, [name])
+            pool = measure(
+                lambda: QuizQuestionLanguage.objects.random_position(language_codes),
+                repeat,
+            )
+            random_order = measure(
+                lambda: QuizQuestion.objects.eligible_titles()
+                .filter(language_code__in=language_codes)
+                .order_by("?")
+                .values_list("movie_id", flat=True)
+                .first(),
+                repeat,
+            )
+            print(
+                f"{name:6s} ({len(language_codes):2d} languages) "
+                f"pool: {pool * 1e6:8.0f} us  "
+                f"order_by('?'): {random_order * 1000:8.1f} ms"
+            )
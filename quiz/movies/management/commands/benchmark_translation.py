@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from movies.tasks.translation import (
+    MAX_BATCH_TOKENS,
+    make_batches,
+    model_registry,
+    translate,
+)
+from movies.models import AlternativeMovieTitle
+
+# Batch size of the previous fixed-size batching
+FIXED_BATCH_SIZE = 25
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares fixed-size batches with length-sorted token batches "
+        "when translating titles (nothing is saved)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--language", default="de")
+        parser.add_argument("--count", type=int, default=500)
+        parser.add_argument("--max-tokens", type=int, default=MAX_BATCH_TOKENS)
+
+    def run_batches(self, tokenizer, model, batches: list[list[str]]) -> float:
+        start = time.perf_counter()
+        for batch in batches:
+            translate(tokenizer, model, batch)
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        titles = list(
+            AlternativeMovieTitle.objects.filter(
+                language_code=options["language"]
+            ).values_list("title", flat=True)[: options["count"]]
+        )
+        if not titles:
+            print("No titles found")
+            return
+
+        tokenizer, model = model_registry.get(options["language"])
+
+        fixed_batches = [
+            titles[i : i + FIXED_BATCH_SIZE]
+            for i in range(0, len(titles), FIXED_BATCH_SIZE)
+        ]
+        lengths = [len(ids) for ids in tokenizer(titles)["input_ids"]]
+        token_batches = make_batches(titles, lengths, options["max_tokens"])
+
+        # Untimed: the first batch pays for lazy initialization and memory
+        # allocation, which would count against whichever run goes first
+        translate(tokenizer, model, fixed_batches[0])
+
+        for name, batches in [
+            (f"fixed ({FIXED_BATCH_SIZE} titles)", fixed_batches),
+            (f"sorted ({options['max_tokens']} tokens)", token_batches),
+        ]:
+            duration = self.run_batches(tokenizer, model, batches)
+            print(
+                f"{name}: {len(batches)} batches, {duration:.1f}s, "
+                f"{len(titles) / duration:.1f} titles/s"
+            )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from movies.models import QuizQuestion
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the precomputed pool of quiz questions"
+
+    def handle(self, *args, **options):
+        QuizQuestion.objects.rebuild()
+        print(f"Question pool size: {QuizQuestion.objects.count()}")
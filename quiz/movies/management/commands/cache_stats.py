@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from movies import cache
+
+
+class Command(BaseCommand):
+    help = "Shows the hit rate of the question and API cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counters afterwards"
+        )
+
+    def handle(self, *args, **options):
+        backend = settings.CACHES["default"]["BACKEND"]
+        if backend.endswith("LocMemCache"):
+            # This process has its own empty cache, not the one of the web workers
+            raise CommandError(
+                "The local-memory cache is not shared between processes, "
+                "set CACHE_URL to a file or Redis cache"
+            )
+
+        stats = cache.get_stats()
+        print(
+            f"Hits: {stats['hits']} Misses: {stats['misses']} "
+            f"Hit rate: {stats['hit_rate']:.1%}"
+        )
+        if options["reset"]:
+            cache.reset_stats()
@@ -0,0 +1,29 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from movies.tasks.export import EXPORT_CHUNK_SIZE, iter_gzip, iter_ndjson
+
+
+class Command(BaseCommand):
+    help = "Exports all movies with titles, cast and directors as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", help="Output file (default: stdout)", default=None
+        )
+        parser.add_argument("--gzip", action="store_true", help="Compress output")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        data = iter_ndjson(options["chunk_size"])
+        if options["gzip"]:
+            data = iter_gzip(data)
+
+        if options["output"] is None:
+            for block in data:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
+        else:
+            with open(options["output"], "wb") as f:
+                for block in data:
+                    f.write(block)
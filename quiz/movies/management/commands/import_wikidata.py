@@ -7,6 +7,11 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("count", type=int)
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start from the most popular movie instead of the last checkpoint",
+        )
 
     def handle(self, *args, **options):
-        WikidataGraphAPI().run(options["count"])
+        WikidataGraphAPI().run(options["count"], restart=options["restart"])
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from movies.tasks.client import WikidataClient
 from movies.tasks.wikidata import WikidataAPI
 from movies.models import Movie
 
@@ -8,7 +9,24 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("count", type=int)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Number of batches downloaded at the same time",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the progress of an interrupted import",
+        )
 
     def handle(self, *args, **options):
-        incomplete_movies = Movie.objects.filter(english_title="")[: options["count"]]
-        WikidataAPI(incomplete_movies).run()
+        concurrency = max(1, options["concurrency"])
+        client = WikidataClient(pool_size=max(10, concurrency))
+
+        # Movies without an English title on Wikidata keep their revision
+        incomplete_movies = Movie.objects.filter(english_title="", lastrevid=0)
+        WikidataAPI(
+            incomplete_movies, client=client, checkpoint_name="import_wikidata_details"
+        ).run(options["count"], concurrency=concurrency, restart=options["restart"])
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from movies.tasks.dump import WikidataDumpImport
+
+
+class Command(BaseCommand):
+    help = "Imports movies from a Wikidata JSON dump (.json, .json.gz or .json.bz2)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Number of processes that parse the dump",
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options["processes"])
+        WikidataDumpImport(options["path"], processes=processes).run()
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, bool]:
+    """
+    Read one HTTP/1.1 response,
+    return its status code and whether the connection can be reused
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in header_lines:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+
+    keep_alive = headers.get("connection", "").lower() != "close"
+    return int(status_line.split()[1]), keep_alive
+
+
+async def run_client(url, deadline: float, latencies: list, errors: list) -> None:
+    port = url.port or 80
+    request = (
+        f"GET {url.path or '/'}{'?' + url.query if url.query else ''} HTTP/1.1\r\n"
+        f"Host: {url.hostname}:{port}\r\n"
+        "Connection: keep-alive\r\n\r\n"
+    ).encode()
+
+    writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(url.hostname, port)
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            errors.append(type(e).__name__)
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+async def run_load_test(url, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(
+        *(
+            run_client(url, deadline, latencies, errors)
+            for _ in range(concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2] if latencies else 0,
+        "p99": latencies[int(len(latencies) * 0.99)] if latencies else 0,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends concurrent requests to a running server "
+        "and reports requests/sec and latency percentiles"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="e.g. http://127.0.0.1:8000/api/questions/")
+        parser.add_argument(
+            "--concurrency", type=int, nargs="+", default=[50, 200, 1000]
+        )
+        parser.add_argument("--duration", type=float, default=10, help="Seconds")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        for concurrency in options["concurrency"]:
+            result = asyncio.run(
+                run_load_test(url, concurrency, options["duration"])
+            )
+            print(
+                f"clients={concurrency:5d} "
+                f"requests={result['requests']:7d} errors={result['errors']:5d} "
+                f"rps={result['rps']:8.1f} "
+                f"p50={result['p50'] * 1000:7.1f}ms p99={result['p99'] * 1000:7.1f}ms"
+            )
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from movies.tasks.client import ResponseCache
+
+
+class Command(BaseCommand):
+    help = "Deletes expired responses from the Wikidata response cache"
+
+    def handle(self, *args, **options):
+        cache = ResponseCache(settings.WIKIDATA_CACHE_DIR, settings.WIKIDATA_CACHE_TTL)
+        count = cache.prune()
+        print(f"Deleted responses: {count}")
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from movies.tasks.client import WikidataClient
+from movies.tasks.wikidata import WikidataRefreshAPI
+from movies.models import Movie
+
+
+class Command(BaseCommand):
+    help = "Updates ``movies.Movie`` objects whose Wikidata entry changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count", type=int, default=None, help="Check at most COUNT movies"
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Number of batches checked at the same time",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the progress of an interrupted refresh",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options["concurrency"])
+        # A refresh must see the current revisions, cached responses are
+        # only reused when replaying (recording still sends every request)
+        cache_mode = "off" if settings.WIKIDATA_CACHE_MODE == "cache" else None
+        client = WikidataClient(pool_size=max(10, concurrency), cache_mode=cache_mode)
+
+        # Including movies that had no English title at the last import
+        downloaded_movies = Movie.objects.exclude(english_title="", lastrevid=0)
+        WikidataRefreshAPI(
+            downloaded_movies, client=client, checkpoint_name="refresh_wikidata"
+        ).run(options["count"], concurrency=concurrency, restart=options["restart"])
@@ -6,9 +6,22 @@ from movies.models import AlternativeMovieTitle
 class Command(BaseCommand):
     help = "Translate titles of movies.AlternativeMovieTitle objects"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes that translate at the same time",
+        )
+
     def handle(self, *args, **options):
-        untranslated = AlternativeMovieTitle.objects.filter(
-            translated_title="", language_code__in=LANGUAGE_MAP.keys()
-        ).exclude(movie__english_title="")
+        # The difference ratio compares with the movie's English title
+        untranslated = (
+            AlternativeMovieTitle.objects.filter(
+                translated_title="", language_code__in=LANGUAGE_MAP.keys()
+            )
+            .exclude(movie__english_title="")
+            .select_related("movie")
+        )
 
-        MovieTitleTranslator(untranslated).run()
+        MovieTitleTranslator(untranslated, workers=max(1, options["workers"])).run()
@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-17 21:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_alternativemovietitle_translation_difference_ratio'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alternativemovietitle',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alternative_titles', to='movies.movie'),
+        ),
+        migrations.CreateModel(
+            name='QuizQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(unique=True)),
+                ('titles', models.JSONField(default=list)),
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_question', to='movies.movie')),
+            ],
+        ),
+    ]
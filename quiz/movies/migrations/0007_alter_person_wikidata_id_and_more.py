@@ -0,0 +1,84 @@
+# Generated by Django 5.1 on 2026-10-17 21:26
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Merge duplicate persons and titles before adding the unique constraints
+    """
+    Person = apps.get_model("movies", "Person")
+    Movie = apps.get_model("movies", "Movie")
+    AlternativeMovieTitle = apps.get_model("movies", "AlternativeMovieTitle")
+
+    duplicate_persons = (
+        Person.objects.values("wikidata_id")
+        .annotate(count=Count("id"), keep_id=Min("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicate_persons:
+        others = Person.objects.filter(wikidata_id=duplicate["wikidata_id"]).exclude(
+            id=duplicate["keep_id"]
+        )
+        for through in (Movie.cast.through, Movie.directed_by.through):
+            credits = through.objects.filter(person__in=others)
+            through.objects.bulk_create(
+                [
+                    through(movie_id=movie_id, person_id=duplicate["keep_id"])
+                    for movie_id in credits.values_list("movie_id", flat=True)
+                ],
+                ignore_conflicts=True,
+            )
+            credits.delete()
+        others.delete()
+
+    duplicate_titles = (
+        AlternativeMovieTitle.objects.values("movie", "language_code")
+        .annotate(count=Count("id"), keep_id=Min("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicate_titles:
+        AlternativeMovieTitle.objects.filter(
+            movie=duplicate["movie"], language_code=duplicate["language_code"]
+        ).exclude(id=duplicate["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_alter_alternativemovietitle_movie_quizquestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='person',
+            name='wikidata_id',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='alternativemovietitle',
+            index=models.Index(fields=['translation_difference_ratio', 'movie'], name='title_ratio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alternativemovietitle',
+            index=models.Index(fields=['language_code'], name='title_language_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alternativemovietitle',
+            index=models.Index(condition=models.Q(('translated_title', '')), fields=['language_code'], name='title_untranslated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-sitelinks', 'id'], name='movie_sitelinks_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('english_title', '')), fields=['id'], name='movie_incomplete_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='alternativemovietitle',
+            constraint=models.UniqueConstraint(fields=('movie', 'language_code'), name='unique_movie_language'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-17 21:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_alter_person_wikidata_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizquestion',
+            name='alias_position',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='quizquestion',
+            name='alias_probability',
+            field=models.FloatField(default=1.0),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1 on 2026-10-17 21:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_quizquestion_alias_position_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizQuestionLanguage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language_code', models.CharField(max_length=10)),
+                ('position', models.PositiveIntegerField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='languages', to='movies.quizquestion')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('language_code', 'position'), name='unique_language_position'), models.UniqueConstraint(fields=('question', 'language_code'), name='unique_question_language')],
+            },
+        ),
+    ]
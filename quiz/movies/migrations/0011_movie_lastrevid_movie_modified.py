@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-17 22:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='lastrevid',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='modified',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-17 22:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_movie_lastrevid_movie_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationMemory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=100)),
+                ('source_text', models.CharField(max_length=250)),
+                ('translated_text', models.CharField(max_length=250)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('model_name', 'source_text'), name='unique_model_source_text')],
+            },
+        ),
+    ]
@@ -1,13 +1,22 @@
-from django.db import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.db.models import Max
+from collections import defaultdict
 from datetime import timedelta
 from difflib import SequenceMatcher
+import random
+import unicodedata
+
+from movies import cache as quiz_cache
+from movies.sampling import POPULARITY_WEIGHTS, build_alias_table
 
 from django.utils.translation import gettext_lazy as _
 
 
 class Person(models.Model):
 
-    wikidata_id = models.CharField(max_length=20)
+    wikidata_id = models.CharField(max_length=20, unique=True)
     name = models.CharField(max_length=100)
 
     def __str__(self):
@@ -28,6 +37,22 @@ class Movie(models.Model):
     )
     duration = models.DurationField(default=timedelta(minutes=0))
 
+    # Wikidata revision of the imported details (``refresh_wikidata``)
+    lastrevid = models.BigIntegerField(default=0)
+    modified = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # API and admin ordering
+            models.Index(fields=["-sitelinks", "id"], name="movie_sitelinks_idx"),
+            # Movies without details (``import_wikidata_details``)
+            models.Index(
+                fields=["id"],
+                condition=models.Q(english_title=""),
+                name="movie_incomplete_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.english_title
 
@@ -42,6 +67,27 @@ class AlternativeMovieTitle(models.Model):
     language_code = models.CharField(max_length=10)
     translation_difference_ratio = models.FloatField(default=1.0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["movie", "language_code"], name="unique_movie_language"
+            ),
+        ]
+        indexes = [
+            # Quiz question pool and admin filter
+            models.Index(
+                fields=["translation_difference_ratio", "movie"],
+                name="title_ratio_idx",
+            ),
+            models.Index(fields=["language_code"], name="title_language_idx"),
+            # Titles waiting for ``translate_movie_titles``
+            models.Index(
+                fields=["language_code"],
+                condition=models.Q(translated_title=""),
+                name="title_untranslated_idx",
+            ),
+        ]
+
     def normalize_titles(self):
         """
         Normalize movie titles to account for common machine translation mistakes
@@ -66,3 +112,626 @@ class AlternativeMovieTitle(models.Model):
 
     def __str__(self):
         return f"{self.title} ({self.language_code};{self.movie.english_title})"
+
+
+# Source texts per query when looking up translations
+TRANSLATION_MEMORY_CHUNK_SIZE = 500
+
+
+class TranslationMemoryManager(models.Manager):
+
+    def get_translations(self, model_name: str, source_texts: list[str]) -> dict:
+        """
+        Return the stored translations of ``source_texts`` by source text
+        """
+        translations = {}
+        for i in range(0, len(source_texts), TRANSLATION_MEMORY_CHUNK_SIZE):
+            chunk = source_texts[i : i + TRANSLATION_MEMORY_CHUNK_SIZE]
+            translations.update(
+                self.filter(model_name=model_name, source_text__in=chunk).values_list(
+                    "source_text", "translated_text"
+                )
+            )
+        return translations
+
+    def store(self, model_name: str, translations: dict[str, str]) -> None:
+        self.bulk_create(
+            [
+                TranslationMemory(
+                    model_name=model_name,
+                    source_text=source_text,
+                    translated_text=translated_text,
+                )
+                for source_text, translated_text in translations.items()
+            ],
+            batch_size=TRANSLATION_MEMORY_CHUNK_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class TranslationMemory(models.Model):
+    """
+    Machine translations by model and normalized source text,
+    so every distinct title is translated only once
+    """
+
+    model_name = models.CharField(max_length=100)
+    source_text = models.CharField(max_length=250)
+    translated_text = models.CharField(max_length=250)
+
+    objects = TranslationMemoryManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model_name", "source_text"], name="unique_model_source_text"
+            ),
+        ]
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def __str__(self):
+        return f"{self.source_text} ({self.model_name})"
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Progress of a resumable import job
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    value = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def get_value(cls, name: str) -> dict | None:
+        checkpoint = cls.objects.filter(name=name).first()
+        return None if checkpoint is None else checkpoint.value
+
+    @classmethod
+    def set_value(cls, name: str, value: dict) -> None:
+        cls.objects.update_or_create(name=name, defaults={"value": value})
+
+    @classmethod
+    def reset(cls, name: str) -> None:
+        cls.objects.filter(name=name).delete()
+
+    def __str__(self):
+        return self.name
+
+
+# Titles that differ enough from the English version to be interesting,
+# but not too much to ensure a fair experience
+QUIZ_MIN_DIFFERENCE_RATIO = 0.25
+QUIZ_MAX_DIFFERENCE_RATIO = 0.75
+
+# Number of alternative titles shown per question
+QUIZ_TITLES_PER_QUESTION = 3
+
+QUIZ_POOL_SIZE_CACHE_KEY = "quiz-question-pool-size"
+QUIZ_LANGUAGE_POOL_SIZE_CACHE_KEY = "quiz-language-pool-size"
+QUIZ_POOL_SIZE_CACHE_TIMEOUT = 60
+
+# Maximum number of movies refreshed per query
+QUIZ_REFRESH_CHUNK_SIZE = 500
+
+
+class QuizQuestionManager(models.Manager):
+
+    def eligible_titles(self):
+        return AlternativeMovieTitle.objects.filter(
+            translation_difference_ratio__gte=QUIZ_MIN_DIFFERENCE_RATIO,
+            translation_difference_ratio__lt=QUIZ_MAX_DIFFERENCE_RATIO,
+        )
+
+    def pool_size(self) -> int:
+        """
+        Upper bound of the ``position`` values, cached between requests
+        """
+        size = cache.get(QUIZ_POOL_SIZE_CACHE_KEY)
+        if size is None:
+            last_position = self.aggregate(Max("position"))["position__max"]
+            size = 0 if last_position is None else last_position + 1
+            cache.set(QUIZ_POOL_SIZE_CACHE_KEY, size, QUIZ_POOL_SIZE_CACHE_TIMEOUT)
+        return size
+
+    async def apool_size(self) -> int:
+        size = await cache.aget(QUIZ_POOL_SIZE_CACHE_KEY)
+        if size is None:
+            last_position = (await self.aaggregate(Max("position")))["position__max"]
+            size = 0 if last_position is None else last_position + 1
+            await cache.aset(
+                QUIZ_POOL_SIZE_CACHE_KEY, size, QUIZ_POOL_SIZE_CACHE_TIMEOUT
+            )
+        return size
+
+    def random_positions(self, count: int, rng=random) -> list[int]:
+        """
+        Pick up to ``count`` distinct random positions
+        """
+        size = self.pool_size()
+        return rng.sample(range(size), min(count, size))
+
+    async def arandom_positions(self, count: int, rng=random) -> list[int]:
+        size = await self.apool_size()
+        return rng.sample(range(size), min(count, size))
+
+    def resolve_aliases(self, positions: list[int], rows, rng=random) -> list[int]:
+        """
+        Replace drawn ``positions`` by their alias with ``1 - alias_probability``
+        """
+        aliases = {row[0]: row[1:] for row in rows}
+        resolved = []
+        for position in positions:
+            alias_probability, alias_position = aliases.get(position, (1.0, None))
+            if alias_position is not None and rng.random() >= alias_probability:
+                position = alias_position
+            resolved.append(position)
+        return list(dict.fromkeys(resolved))
+
+    def weighted_random_positions(self, count: int, rng=random) -> list[int]:
+        """
+        Pick up to ``count`` random positions weighted by popularity
+        using the alias table (see ``rebuild_alias_table``)
+        """
+        positions = self.random_positions(count, rng)
+        rows = self.filter(position__in=positions).values_list(
+            "position", "alias_probability", "alias_position"
+        )
+        return self.resolve_aliases(positions, rows, rng)
+
+    async def aweighted_random_positions(self, count: int, rng=random) -> list[int]:
+        positions = await self.arandom_positions(count, rng)
+        rows = self.filter(position__in=positions).values_list(
+            "position", "alias_probability", "alias_position"
+        )
+        return self.resolve_aliases(positions, [row async for row in rows], rng)
+
+    def at_position(self, position: int):
+        """
+        Return the ``QuizQuestion`` at ``position`` (or ``None`` if the pool
+        is empty) with a single index lookup
+        """
+        questions = self.select_related("movie").order_by("position")
+
+        # Positions are dense, ``__gte`` only matters for gaps left by
+        # deleted movies or a stale cached pool size
+        return (
+            questions.filter(position__gte=position).first() or questions.first()
+        )
+
+    async def aat_position(self, position: int):
+        questions = self.select_related("movie").order_by("position")
+        return (
+            await questions.filter(position__gte=position).afirst()
+            or await questions.afirst()
+        )
+
+    def random(self):
+        """
+        Return a random ``QuizQuestion`` (or ``None`` if the pool is empty)
+        """
+        positions = self.random_positions(1)
+        if not positions:
+            return None
+        return self.at_position(positions[0])
+
+    def _collect_titles(self, movie_ids=None) -> dict[int, list[dict]]:
+        titles = self.eligible_titles()
+        if movie_ids is not None:
+            titles = titles.filter(movie_id__in=movie_ids)
+
+        titles_by_movie = {}
+        for title in titles.order_by("id").values(
+            "id", "movie_id", "title", "translated_title", "language_code"
+        ):
+            titles_by_movie.setdefault(title.pop("movie_id"), []).append(title)
+        return titles_by_movie
+
+    @transaction.atomic
+    def rebuild_alias_table(self) -> None:
+        """
+        Recompute the popularity weighted alias table,
+        only rows whose alias entry changed are written
+        """
+        weight = POPULARITY_WEIGHTS[settings.QUIZ_POPULARITY_WEIGHT]
+        rows = list(
+            self.order_by("position").values_list(
+                "id",
+                "position",
+                "movie__sitelinks",
+                "alias_probability",
+                "alias_position",
+            )
+        )
+        probabilities, aliases = build_alias_table(
+            [weight(max(row[2], 0)) for row in rows]
+        )
+
+        changed_rows = []
+        for row, probability, alias in zip(rows, probabilities, aliases):
+            id, _, _, old_probability, old_alias_position = row
+            alias_position = rows[alias][1]
+            if (
+                old_alias_position != alias_position
+                or abs(old_probability - probability) > 1e-9
+            ):
+                changed_rows.append((probability, alias_position, id))
+
+        if not changed_rows:
+            return
+
+        # Plain executemany(), bulk_update() is too slow for a full rewrite
+        quote_name = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {quote_name(self.model._meta.db_table)} "
+                f"SET {quote_name('alias_probability')} = %s, "
+                f"{quote_name('alias_position')} = %s "
+                f"WHERE {quote_name('id')} = %s",
+                changed_rows,
+            )
+        quiz_cache.invalidate()
+
+    @transaction.atomic
+    def rebuild(self) -> None:
+        """
+        Recreate the whole question pool
+        """
+        self.all().delete()
+        self.bulk_create(
+            (
+                QuizQuestion(position=position, movie_id=movie_id, titles=titles)
+                for position, (movie_id, titles) in enumerate(
+                    self._collect_titles().items()
+                )
+            ),
+            batch_size=1000,
+        )
+        QuizQuestionLanguage.objects.rebuild()
+        self.rebuild_alias_table()
+        cache.delete(QUIZ_POOL_SIZE_CACHE_KEY)
+        quiz_cache.invalidate()
+
+    @transaction.atomic
+    def refresh(self, movie_ids, remove: bool = False) -> None:
+        """
+        Update the pool entries of the given movies,
+        e.g. after their titles were translated.
+        ``remove=True`` removes them regardless of their titles,
+        e.g. before the movies get deleted.
+        Positions are kept dense by filling gaps with the last entries.
+        """
+        movie_ids = list(set(movie_ids))
+        if len(movie_ids) > QUIZ_REFRESH_CHUNK_SIZE:
+            for i in range(0, len(movie_ids), QUIZ_REFRESH_CHUNK_SIZE):
+                self.refresh(movie_ids[i : i + QUIZ_REFRESH_CHUNK_SIZE], remove)
+            return
+        if not movie_ids:
+            return
+
+        titles_by_movie = {} if remove else self._collect_titles(movie_ids)
+
+        updated_questions = []
+        removed_questions = []
+        for question in self.filter(movie_id__in=movie_ids).only(
+            "id", "movie_id", "position"
+        ):
+            titles = titles_by_movie.pop(question.movie_id, None)
+            if titles:
+                question.titles = titles
+                updated_questions.append(question)
+            else:
+                removed_questions.append(question)
+
+        self.bulk_update(updated_questions, ["titles"], batch_size=1000)
+
+        # Update the language pools before their questions get deleted
+        languages_by_question = {
+            question.id: question.get_language_codes()
+            for question in updated_questions
+        }
+        languages_by_question.update(
+            (question.id, set()) for question in removed_questions
+        )
+        QuizQuestionLanguage.objects.sync(languages_by_question)
+
+        removed_positions = [question.position for question in removed_questions]
+        self.filter(id__in=[question.id for question in removed_questions]).delete()
+        # Entries whose alias was removed keep their own position
+        self.filter(alias_position__in=removed_positions).update(alias_position=None)
+
+        new_questions = [
+            QuizQuestion(movie_id=movie_id, titles=titles)
+            for movie_id, titles in titles_by_movie.items()
+        ]
+        moves = fill_positions(self.all(), new_questions, removed_positions)
+        for old_position, new_position in moves:
+            self.filter(alias_position=old_position).update(
+                alias_position=new_position
+            )
+        QuizQuestionLanguage.objects.sync(
+            {
+                question.id: question.get_language_codes()
+                for question in self.filter(movie_id__in=titles_by_movie.keys())
+            }
+        )
+
+        cache.delete(QUIZ_POOL_SIZE_CACHE_KEY)
+        quiz_cache.invalidate()
+
+
+def fill_positions(
+    queryset, new_objects: list, free_positions: list[int]
+) -> list[tuple[int, int]]:
+    """
+    Create ``new_objects`` with dense positions within ``queryset``:
+    free positions are taken first, then objects get appended.
+    Remaining gaps are filled with the last entries,
+    return their moves as ``(old position, new position)``.
+    """
+    free_positions = sorted(free_positions, reverse=True)
+    last_position = queryset.aggregate(Max("position"))["position__max"]
+    next_position = 0 if last_position is None else last_position + 1
+    for obj in new_objects:
+        if free_positions:
+            obj.position = free_positions.pop()
+        else:
+            obj.position = next_position
+            next_position += 1
+    queryset.bulk_create(new_objects, batch_size=1000)
+
+    moves = []
+    while free_positions:
+        position = free_positions.pop()
+        last = queryset.order_by("-position").only("id", "position").first()
+        if last is None or last.position < position:
+            break
+        queryset.filter(id=last.id).update(position=position)
+        moves.append((last.position, position))
+    return moves
+
+
+class QuizQuestion(models.Model):
+    """
+    Precomputed question pool: one entry per movie that has
+    eligible alternative titles.
+    ``position`` is dense (0...n-1) so a random question
+    can be picked without sorting the titles table.
+    """
+
+    position = models.PositiveIntegerField(unique=True)
+    movie = models.OneToOneField(
+        Movie, on_delete=models.CASCADE, related_name="quiz_question"
+    )
+    # Denormalized eligible titles:
+    # [{"id": ..., "title": ..., "translated_title": ..., "language_code": ...}]
+    titles = models.JSONField(default=list)
+
+    # Alias table for popularity weighted sampling:
+    # keep ``position`` with ``alias_probability``, otherwise use ``alias_position``.
+    # New entries are only picked by their own position until the next rebuild,
+    # aliases follow entries that ``refresh`` moves and are cleared when removed.
+    alias_probability = models.FloatField(default=1.0)
+    alias_position = models.PositiveIntegerField(null=True, blank=True)
+
+    objects = QuizQuestionManager()
+
+    @staticmethod
+    def sample_titles(
+        titles: list[dict], rng=random, language_codes=None
+    ) -> list[dict]:
+        if language_codes is not None:
+            titles = [t for t in titles if t["language_code"] in language_codes]
+        return rng.sample(titles, min(len(titles), QUIZ_TITLES_PER_QUESTION))
+
+    @staticmethod
+    def get_title_language_codes(titles: list[dict]) -> set[str]:
+        return {title["language_code"] for title in titles}
+
+    def get_language_codes(self) -> set[str]:
+        return self.get_title_language_codes(self.titles)
+
+    def pick_titles(self) -> list[dict]:
+        return self.sample_titles(self.titles)
+
+    def to_dict(self) -> dict:
+        return {
+            "movie": {
+                "id": self.movie_id,
+                "english_title": self.movie.english_title,
+                "description": self.movie.description,
+            },
+            "titles": self.titles,
+        }
+
+    def __str__(self):
+        return f"{self.position}: {self.movie.english_title}"
+
+
+class QuizQuestionLanguageManager(models.Manager):
+
+    def pool_sizes(self, language_codes) -> dict[str, int]:
+        keys = {
+            code: f"{QUIZ_LANGUAGE_POOL_SIZE_CACHE_KEY}:{code}"
+            for code in language_codes
+        }
+        cached_sizes = cache.get_many(keys.values())
+
+        sizes = {}
+        for code, key in keys.items():
+            size = cached_sizes.get(key)
+            if size is None:
+                last_position = self.filter(language_code=code).aggregate(
+                    Max("position")
+                )["position__max"]
+                size = 0 if last_position is None else last_position + 1
+                cache.set(key, size, QUIZ_POOL_SIZE_CACHE_TIMEOUT)
+            sizes[code] = size
+        return sizes
+
+    async def apool_sizes(self, language_codes) -> dict[str, int]:
+        keys = {
+            code: f"{QUIZ_LANGUAGE_POOL_SIZE_CACHE_KEY}:{code}"
+            for code in language_codes
+        }
+        cached_sizes = await cache.aget_many(keys.values())
+
+        sizes = {}
+        for code, key in keys.items():
+            size = cached_sizes.get(key)
+            if size is None:
+                last_position = (
+                    await self.filter(language_code=code).aaggregate(Max("position"))
+                )["position__max"]
+                size = 0 if last_position is None else last_position + 1
+                await cache.aset(key, size, QUIZ_POOL_SIZE_CACHE_TIMEOUT)
+            sizes[code] = size
+        return sizes
+
+    def draw(self, sizes: dict[str, int], rng=random):
+        """
+        Pick a language proportionally to its pool size (so every entry is
+        equally likely) and a random position within its pool.
+        Return the query for the question's position in the main pool.
+        """
+        sizes = {code: size for code, size in sizes.items() if size}
+        if not sizes:
+            return None
+        language_code = rng.choices(list(sizes), weights=list(sizes.values()))[0]
+        return (
+            self.filter(
+                language_code=language_code,
+                position__gte=rng.randrange(sizes[language_code]),
+            )
+            .order_by("position")
+            .values_list("question__position", flat=True)
+        )
+
+    def random_position(self, language_codes, rng=random) -> int | None:
+        """
+        Position (in the main pool) of a random question
+        with eligible titles in one of ``language_codes``
+        """
+        query = self.draw(self.pool_sizes(language_codes), rng)
+        return None if query is None else query.first()
+
+    async def arandom_position(self, language_codes, rng=random) -> int | None:
+        query = self.draw(await self.apool_sizes(language_codes), rng)
+        return None if query is None else await query.afirst()
+
+    def random_positions(self, language_codes, count: int, rng=random) -> list[int]:
+        sizes = self.pool_sizes(language_codes)
+        queries = (self.draw(sizes, rng) for _ in range(count))
+        positions = (query.first() for query in queries if query is not None)
+        return list(dict.fromkeys(p for p in positions if p is not None))
+
+    async def arandom_positions(
+        self, language_codes, count: int, rng=random
+    ) -> list[int]:
+        sizes = await self.apool_sizes(language_codes)
+        positions = []
+        for _ in range(count):
+            query = self.draw(sizes, rng)
+            if query is not None:
+                positions.append(await query.afirst())
+        return list(dict.fromkeys(p for p in positions if p is not None))
+
+    def clear_pool_sizes(self, language_codes) -> None:
+        cache.delete_many(
+            [f"{QUIZ_LANGUAGE_POOL_SIZE_CACHE_KEY}:{code}" for code in language_codes]
+        )
+
+    @transaction.atomic
+    def rebuild(self) -> None:
+        """
+        Recreate all language pools from the main question pool
+        """
+        self.all().delete()
+
+        next_positions = defaultdict(int)
+        entries = []
+        for question_id, titles in QuizQuestion.objects.order_by(
+            "position"
+        ).values_list("id", "titles"):
+            for code in QuizQuestion.get_title_language_codes(titles):
+                entries.append(
+                    QuizQuestionLanguage(
+                        question_id=question_id,
+                        language_code=code,
+                        position=next_positions[code],
+                    )
+                )
+                next_positions[code] += 1
+        self.bulk_create(entries, batch_size=1000)
+        self.clear_pool_sizes(next_positions.keys())
+
+    @transaction.atomic
+    def sync(self, languages_by_question: dict[int, set[str]]) -> None:
+        """
+        Add and remove the language entries of the given questions
+        to match ``languages_by_question``, keeping positions dense
+        """
+        missing = {
+            question_id: set(codes)
+            for question_id, codes in languages_by_question.items()
+        }
+        removed_ids = []
+        free_positions = defaultdict(list)
+        for entry in self.filter(question_id__in=missing.keys()).only(
+            "id", "question_id", "language_code", "position"
+        ):
+            if entry.language_code in missing[entry.question_id]:
+                missing[entry.question_id].discard(entry.language_code)
+            else:
+                removed_ids.append(entry.id)
+                free_positions[entry.language_code].append(entry.position)
+        self.filter(id__in=removed_ids).delete()
+
+        new_entries = defaultdict(list)
+        for question_id, codes in missing.items():
+            for code in codes:
+                new_entries[code].append(
+                    QuizQuestionLanguage(question_id=question_id, language_code=code)
+                )
+
+        language_codes = free_positions.keys() | new_entries.keys()
+        for code in language_codes:
+            fill_positions(
+                self.filter(language_code=code),
+                new_entries[code],
+                free_positions[code],
+            )
+        self.clear_pool_sizes(language_codes)
+
+
+class QuizQuestionLanguage(models.Model):
+    """
+    Per-language question pools: one entry per question and language
+    with an eligible title. ``position`` is dense within each language.
+    """
+
+    language_code = models.CharField(max_length=10)
+    position = models.PositiveIntegerField()
+    question = models.ForeignKey(
+        QuizQuestion, on_delete=models.CASCADE, related_name="languages"
+    )
+
+    objects = QuizQuestionLanguageManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["language_code", "position"],
+                name="unique_language_position",
+            ),
+            models.UniqueConstraint(
+                fields=["question", "language_code"],
+                name="unique_question_language",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.language_code} {self.position}: {self.question}"
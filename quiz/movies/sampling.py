@@ -0,0 +1,51 @@
+import math
+
+# Functions that turn ``Movie.sitelinks`` into a sampling weight,
+# selected with the ``QUIZ_POPULARITY_WEIGHT`` setting
+POPULARITY_WEIGHTS = {
+    "linear": lambda sitelinks: sitelinks,
+    "sqrt": math.sqrt,
+    "log": math.log1p,
+}
+
+
+def is_popular_mode(request) -> bool:
+    """
+    ``?mode=popular`` picks movies proportionally to their popularity
+    """
+    return request.GET.get("mode") == "popular"
+
+
+def build_alias_table(weights: list[float]) -> tuple[list[float], list[int]]:
+    """
+    Vose's alias method: returns ``(probability, alias)`` so that
+    picking a uniform index ``i`` and keeping it with ``probability[i]``
+    (otherwise taking ``alias[i]``) samples proportionally to ``weights``
+    """
+    n = len(weights)
+    total = sum(weights)
+    if n == 0:
+        return [], []
+    if total <= 0:
+        return [1.0] * n, list(range(n))
+
+    scaled = [weight * n / total for weight in weights]
+    probability = [1.0] * n
+    alias = list(range(n))
+
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        probability[less] = scaled[less]
+        alias[less] = more
+        scaled[more] = scaled[more] + scaled[less] - 1.0
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+
+    # Remaining entries are 1.0 apart from rounding errors
+    return probability, alias
@@ -0,0 +1,50 @@
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from movies import cache
+from movies.models import AlternativeMovieTitle, Movie, QuizQuestion
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(post_save, sender=AlternativeMovieTitle)
+@receiver(post_delete, sender=AlternativeMovieTitle)
+def invalidate_cache(sender, **kwargs):
+    cache.invalidate()
+
+
+@receiver(post_save, sender=AlternativeMovieTitle)
+@receiver(post_delete, sender=AlternativeMovieTitle)
+def refresh_quiz_question(sender, instance, raw=False, **kwargs):
+    # A title edited in the admin may change the movie's eligible titles,
+    # bulk imports and translations refresh their movies themselves
+    if not raw:
+        QuizQuestion.objects.refresh([instance.movie_id])
+
+
+@receiver(pre_delete, sender=Movie)
+def remove_quiz_question(sender, instance, **kwargs):
+    # The cascade would delete the question and its language entries
+    # without filling their positions
+    QuizQuestion.objects.refresh([instance.id], remove=True)
+
+
+@receiver(post_migrate)
+def build_quiz_questions(sender, using, verbosity=1, **kwargs):
+    # Databases that had movies before the question pool existed
+    # would have no questions until ``build_question_pool`` is run
+    if sender.name != "movies":
+        return
+    executor = MigrationExecutor(connections[using])
+    if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+        return
+    if (
+        QuizQuestion.objects.exists()
+        or not QuizQuestion.objects.eligible_titles().exists()
+    ):
+        return
+    QuizQuestion.objects.rebuild()
+    if verbosity:
+        print(f"Question pool size: {QuizQuestion.objects.count()}")
@@ -0,0 +1,273 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+from django.conf import settings
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes that are worth another try
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Upper bound for a single backoff in seconds
+MAX_BACKOFF = 60.0
+
+# Request params that don't change the response
+IGNORED_CACHE_PARAMS = {"maxlag"}
+
+# "off": always send requests, "cache": reuse fresh responses,
+# "record": send requests and store every response,
+# "replay": only use stored responses (no network, TTL ignored)
+CACHE_MODES = ["off", "cache", "record", "replay"]
+
+
+class WikidataError(Exception):
+    pass
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all threads that use the same client.
+    ``pause`` blocks every caller, e.g. after a ``Retry-After`` header.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.rate <= 0:
+                    return
+                else:
+                    elapsed = now - self.updated_at
+                    self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+                    self.updated_at = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class ResponseCache:
+    """
+    Gzipped JSON responses on disk, addressed by a hash of the request
+    """
+
+    def __init__(self, directory: str | Path, ttl: float, mode: str = "cache"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.mode = mode
+
+    def get_key(self, url: str, params: dict | None) -> str:
+        params = {
+            key: str(value)
+            for key, value in (params or {}).items()
+            if key not in IGNORED_CACHE_PARAMS
+        }
+        request = json.dumps([url, params], sort_keys=True)
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def get_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json.gz"
+
+    def is_expired(self, path: Path) -> bool:
+        return self.ttl > 0 and time.time() - path.stat().st_mtime > self.ttl
+
+    def get(self, key: str) -> dict | None:
+        if self.mode not in ("cache", "replay"):
+            return None
+
+        path = self.get_path(key)
+        try:
+            if self.mode == "cache" and self.is_expired(path):
+                path.unlink(missing_ok=True)
+                return None
+            with gzip.open(path, "rt") as f:
+                return json.load(f)
+        except (FileNotFoundError, EOFError, ValueError):
+            return None
+
+    def set(self, key: str, response_json: dict) -> None:
+        if self.mode not in ("cache", "record"):
+            return
+
+        path = self.get_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first, other threads may read the entry
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f, gzip.open(f, "wt") as gz:
+            json.dump(response_json, gz)
+        os.replace(tmp_path, path)
+
+    def prune(self) -> int:
+        """
+        Delete expired responses and return their number
+        """
+        count = 0
+        for path in self.directory.glob("*/*.json.gz"):
+            if self.is_expired(path):
+                path.unlink(missing_ok=True)
+                count += 1
+        return count
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Seconds from a ``Retry-After`` header (delay or HTTP date)
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class WikidataClient:
+    """
+    Pooled HTTP client for the Wikidata API and the SPARQL endpoint
+    with rate limiting and retries. Defaults come from the ``WIKIDATA_*`` settings.
+    """
+
+    def __init__(
+        self,
+        api_url: str | None = None,
+        sparql_url: str | None = None,
+        requests_per_second: float | None = None,
+        timeout: float | None = None,
+        max_retries: int | None = None,
+        maxlag: int | None = None,
+        pool_size: int = 10,
+        cache_mode: str | None = None,
+    ):
+        self.api_url = api_url or settings.WIKIDATA_API_URL
+        self.sparql_url = sparql_url or settings.WIKIDATA_SPARQL_URL
+        self.timeout = timeout if timeout is not None else settings.WIKIDATA_TIMEOUT
+        self.max_retries = (
+            max_retries if max_retries is not None else settings.WIKIDATA_MAX_RETRIES
+        )
+        self.maxlag = maxlag if maxlag is not None else settings.WIKIDATA_MAXLAG
+
+        if requests_per_second is None:
+            requests_per_second = settings.WIKIDATA_REQUESTS_PER_SECOND
+        self.rate_limiter = RateLimiter(
+            requests_per_second, burst=max(1, int(requests_per_second))
+        )
+
+        cache_mode = cache_mode or settings.WIKIDATA_CACHE_MODE
+        self.response_cache = None
+        if cache_mode != "off":
+            self.response_cache = ResponseCache(
+                settings.WIKIDATA_CACHE_DIR, settings.WIKIDATA_CACHE_TTL, cache_mode
+            )
+
+        # Keep-alive connections, one pool per host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = settings.WIKIDATA_USER_AGENT
+
+    def backoff(self, attempt: int) -> float:
+        # "Full jitter": concurrent workers don't retry in lockstep
+        return random.uniform(0, min(MAX_BACKOFF, 2**attempt))
+
+    def get(self, url: str, params: dict | None = None) -> dict:
+        """
+        Send a GET request and return the decoded JSON response
+        """
+
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.get_key(url, params)
+            response_json = self.response_cache.get(cache_key)
+            if response_json is not None:
+                return response_json
+            if self.response_cache.mode == "replay":
+                raise WikidataError(f"Response not recorded: {url} {params}")
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            self.rate_limiter.acquire()
+
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise WikidataError(f"Request failed: {e}") from e
+                time.sleep(self.backoff(attempt))
+                continue
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            if response.status_code in RETRY_STATUS_CODES:
+                if last_attempt:
+                    raise WikidataError("Error: " + str(response.status_code))
+                self.rate_limiter.pause(
+                    retry_after if retry_after is not None else self.backoff(attempt)
+                )
+                continue
+
+            if response.status_code != 200:
+                raise WikidataError("Error: " + str(response.status_code))
+
+            response_json = response.json()
+            if "error" in response_json:
+                # The API answers with "maxlag" while the replicas lag behind
+                if response_json["error"].get("code") == "maxlag" and not last_attempt:
+                    self.rate_limiter.pause(
+                        retry_after if retry_after is not None else self.maxlag
+                    )
+                    continue
+                raise WikidataError(response_json["error"].get("info", "Unknown error"))
+
+            if cache_key is not None:
+                self.response_cache.set(cache_key, response_json)
+            return response_json
+
+        raise WikidataError("Too many retries")
+
+    def api(self, params: dict) -> dict:
+        """
+        Request the Wikidata action API
+        """
+        params = {"format": "json", **params}
+        if self.maxlag:
+            params["maxlag"] = self.maxlag
+        return self.get(self.api_url, params)
+
+    def sparql(self, query: str) -> list[dict]:
+        """
+        Run a SPARQL query and return the result bindings
+        """
+        response = self.get(self.sparql_url, {"query": query, "format": "json"})
+        return response["results"]["bindings"]
@@ -0,0 +1,273 @@
+import bz2
+import gzip
+import hashlib
+import json
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.utils.module_loading import import_string
+
+from movies.models import Person, Movie, QuizQuestion
+from movies.tasks.wikidata import (
+    LABEL_PROPERTIES,
+    WRITE_BATCH_SIZE,
+    WikidataAPI,
+)
+from movies.tasks.workers import init_worker
+
+# Dump lines handed to a worker at once
+LINES_PER_BLOCK = 1000
+
+# Films stored per transaction
+FILMS_PER_BATCH = 500
+
+FILM = "Q11424"
+
+# Claims needed by ``WikidataAPI.parse_movie``
+FILM_PROPERTIES = [
+    property_id
+    for property_ids, _ in LABEL_PROPERTIES + [("P577", 1), ("P2047", 1)]
+    for property_id in property_ids.split("|")
+]
+
+# Bloom filter of the people without a name, handed to the label workers:
+# ~1% false positives, never larger than 16 MB however many people there are
+ID_FILTER_BITS_PER_ID = 10
+ID_FILTER_MAX_BITS = 2**27
+ID_FILTER_HASHES = 7
+
+
+def open_dump(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_blocks(path: str):
+    """
+    Yield the entity lines of a dump in blocks of ``LINES_PER_BLOCK``.
+    Full dumps are one JSON array with an entity per line,
+    filtered subsets may also be plain NDJSON.
+    """
+
+    block = []
+    with open_dump(path) as f:
+        for line in f:
+            line = line.rstrip(b",\r\n")
+            if line in (b"", b"[", b"]"):
+                continue
+            block.append(line)
+            if len(block) == LINES_PER_BLOCK:
+                yield block
+                block = []
+    if block:
+        yield block
+
+
+def is_film(entity: dict) -> bool:
+    for claim in entity.get("claims", {}).get("P31", []):
+        value = claim["mainsnak"].get("datavalue", {}).get("value", {})
+        if isinstance(value, dict) and value.get("id") == FILM:
+            return True
+    return False
+
+
+def parse_films(lines: list[bytes]) -> list[dict]:
+    """
+    Return the films with an English title, reduced to what the import needs
+    """
+
+    films = []
+    for line in lines:
+        # Skip most entities without decoding them
+        if FILM.encode() not in line:
+            continue
+        entity = json.loads(line)
+        if not is_film(entity) or "en" not in entity.get("labels", {}):
+            continue
+
+        claims = entity.get("claims", {})
+        films.append(
+            {
+                "id": entity["id"],
+                "sitelinks": len(entity.get("sitelinks", {})),
+                "labels": entity["labels"],
+                "descriptions": entity.get("descriptions", {}),
+                "claims": {p: claims[p] for p in FILM_PROPERTIES if p in claims},
+                "lastrevid": entity.get("lastrevid", 0),
+                "modified": entity.get("modified"),
+            }
+        )
+    return films
+
+
+class IdFilter:
+    """
+    Bloom filter of Wikidata-IDs.
+    False positives have to be dropped by the caller.
+    """
+
+    def __init__(self, size: int, bits: bytes | None = None):
+        self.size = max(8, size)
+        self.bits = bytearray(bits or (self.size + 7) // 8)
+
+    def get_bit_positions(self, entity_id: str):
+        digest = hashlib.blake2b(entity_id.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return ((h1 + i * h2) % self.size for i in range(ID_FILTER_HASHES))
+
+    def __contains__(self, entity_id: str | None) -> bool:
+        return entity_id is not None and all(
+            self.bits[bit >> 3] & (1 << (bit & 7))
+            for bit in self.get_bit_positions(entity_id)
+        )
+
+    def add(self, entity_id: str) -> None:
+        for bit in self.get_bit_positions(entity_id):
+            self.bits[bit >> 3] |= 1 << (bit & 7)
+
+
+# Wikidata-IDs whose label ``parse_labels`` looks for (set per worker)
+wanted_ids = IdFilter(0)
+
+
+def set_wanted_ids(size: int, bits: bytes) -> None:
+    # Plain arguments: spawned workers unpickle them before ``django.setup``
+    global wanted_ids
+    wanted_ids = IdFilter(size, bits)
+
+
+def get_entity_id(line: bytes) -> str | None:
+    # Entities start with {"type":"item","id":"Q..." in the dumps
+    start = line.find(b'"id":"')
+    if start == -1:
+        return None
+    start += len(b'"id":"')
+    return line[start : line.find(b'"', start)].decode()
+
+
+def parse_labels(lines: list[bytes]) -> list[tuple[str, str]]:
+    """
+    Return ``(Wikidata-ID, English label)`` of the entities in ``wanted_ids``
+    (and of its false positives)
+    """
+
+    labels = []
+    for line in lines:
+        if get_entity_id(line) not in wanted_ids:
+            continue
+        entity = json.loads(line)
+        label = entity.get("labels", {}).get("en")
+        if label is not None:
+            labels.append((entity["id"], label["value"]))
+    return labels
+
+
+class WikidataDumpImport(WikidataAPI):
+    """
+    Create and update movies from a Wikidata JSON dump without network access
+    """
+
+    def __init__(self, path: str, processes: int = 1):
+        super().__init__(Movie.objects.none())
+        self.path = path
+        self.processes = processes
+
+    def map_blocks(self, func, initializer: str | None = None, initargs=()):
+        """
+        Apply ``func`` to the blocks of the dump, in order.
+        ``initializer`` is the dotted path of a function called once per process.
+        At most two blocks per process are read ahead.
+        """
+
+        if self.processes <= 1:
+            if initializer is not None:
+                import_string(initializer)(*initargs)
+            for block in iter_blocks(self.path):
+                yield func(block)
+            return
+
+        with ProcessPoolExecutor(
+            self.processes, initializer=init_worker, initargs=(initializer, *initargs)
+        ) as executor:
+            pending = deque()
+            for block in iter_blocks(self.path):
+                pending.append(executor.submit(func, block))
+                if len(pending) >= self.processes * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def save_films(self, films: list[dict]) -> None:
+        Movie.objects.bulk_create(
+            [Movie(wikidata_id=f["id"], sitelinks=f["sitelinks"]) for f in films],
+            batch_size=WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["wikidata_id"],
+            update_fields=["sitelinks"],
+        )
+        batch = list(Movie.objects.filter(wikidata_id__in=[f["id"] for f in films]))
+
+        # Names are added by ``import_names`` once all films are known
+        movies_json = {
+            f["id"]: self.parse_movie(
+                f, dict.fromkeys(self.get_referenced_ids(f), "")
+            )
+            for f in films
+        }
+        self.save_batch(batch, movies_json)
+
+    def import_films(self) -> None:
+        films = []
+        film_count = 0
+        for block_films in self.map_blocks(parse_films):
+            films.extend(block_films)
+            if len(films) >= FILMS_PER_BATCH:
+                self.save_films(films)
+                film_count += len(films)
+                print(f"Number of films: {film_count}")
+                films = []
+        if films:
+            self.save_films(films)
+            film_count += len(films)
+        print(f"Number of films: {film_count}")
+
+    def import_names(self) -> None:
+        """
+        Second pass: add the names of people that were created without one
+        """
+
+        unnamed = Person.objects.filter(name="")
+        count = unnamed.count()
+        print(f"Looking up names: {count}")
+        if not count:
+            return
+
+        # The workers only get a compact filter of the ids, not the ids
+        ids = IdFilter(min(ID_FILTER_MAX_BITS, count * ID_FILTER_BITS_PER_ID))
+        for wikidata_id in unnamed.values_list("wikidata_id", flat=True).iterator(
+            chunk_size=WRITE_BATCH_SIZE
+        ):
+            ids.add(wikidata_id)
+
+        for names in self.map_blocks(
+            parse_labels, "movies.tasks.dump.set_wanted_ids", (ids.size, ids.bits)
+        ):
+            if not names:
+                continue
+            # At most one block of names, the join drops the false positives
+            names = dict(names)
+            people = list(unnamed.filter(wikidata_id__in=names))
+            for person in people:
+                person.name = names[person.wikidata_id]
+            Person.objects.bulk_update(people, ["name"], batch_size=WRITE_BATCH_SIZE)
+
+    def run(self) -> None:
+        print(f"Start dump import: {self.path}")
+        self.import_films()
+        self.import_names()
+
+        QuizQuestion.objects.rebuild_alias_table()
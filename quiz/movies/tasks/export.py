@@ -0,0 +1,118 @@
+import json
+import zlib
+from collections.abc import AsyncIterator, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from movies.models import Movie, AlternativeMovieTitle
+
+# Number of movies fetched (and prefetched) per database round trip
+EXPORT_CHUNK_SIZE = 1000
+
+MOVIE_FIELDS = [
+    "id",
+    "wikidata_id",
+    "sitelinks",
+    "english_title",
+    "description",
+    "release_date",
+    "duration",
+]
+
+
+def iter_chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_credits(through, movie_ids: list[int]) -> dict[int, list[dict]]:
+    credits = {}
+    for credit in (
+        through.objects.filter(movie_id__in=movie_ids)
+        .order_by("id")
+        .values("movie_id", "person__wikidata_id", "person__name")
+    ):
+        credits.setdefault(credit["movie_id"], []).append(
+            {"wikidata_id": credit["person__wikidata_id"], "name": credit["person__name"]}
+        )
+    return credits
+
+
+def iter_movies(chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[list[dict]]:
+    """
+    Yield chunks of movies including their alternative titles, cast and directors.
+    Related objects are fetched per chunk, so memory usage
+    only depends on ``chunk_size``.
+    """
+    movies = Movie.objects.order_by("id").values(*MOVIE_FIELDS)
+
+    for chunk in iter_chunks(movies.iterator(chunk_size=chunk_size), chunk_size):
+        movie_ids = [movie["id"] for movie in chunk]
+
+        titles = {}
+        for title in (
+            AlternativeMovieTitle.objects.filter(movie_id__in=movie_ids)
+            .order_by("id")
+            .values(
+                "movie_id",
+                "title",
+                "language_code",
+                "translated_title",
+                "translation_difference_ratio",
+            )
+        ):
+            titles.setdefault(title.pop("movie_id"), []).append(title)
+
+        cast = get_credits(Movie.cast.through, movie_ids)
+        directors = get_credits(Movie.directed_by.through, movie_ids)
+
+        for movie in chunk:
+            movie_id = movie.pop("id")
+            movie["alternative_titles"] = titles.get(movie_id, [])
+            movie["cast"] = cast.get(movie_id, [])
+            movie["directed_by"] = directors.get(movie_id, [])
+        yield chunk
+
+
+def iter_ndjson(chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield the movie catalogue as newline-delimited JSON, one chunk at a time
+    """
+    for chunk in iter_movies(chunk_size):
+        yield "".join(
+            json.dumps(movie, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+            for movie in chunk
+        ).encode()
+
+
+def iter_gzip(data: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Compress a byte stream into a gzip stream on the fly
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for block in data:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def aiter_blocks(data: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Async wrapper of a byte stream for ``StreamingHttpResponse`` under ASGI,
+    which would otherwise consume a sync iterator completely before sending it.
+    The blocks (and their database queries) are produced in a thread.
+    """
+    next_block = sync_to_async(next)
+    while True:
+        block = await next_block(data, None)
+        if block is None:
+            return
+        yield block
@@ -1,116 +1,305 @@
 from transformers import MarianMTModel, MarianTokenizer
-from collections import defaultdict
-
-from movies.models import AlternativeMovieTitle
-
-# Map language codes to translation models
-LANGUAGE_MAP = {
-    "de": "de",
-    "fr": "fr",
-    "es": "es",
-    "da": "da",
-    "ru": "ru",
-    "cs": "cs",
-    "it": "it",
-    "sv": "sv",
-    "ro": "ROMANCE",
-    "ja": "ja",
-    "fi": "fi",
-    "ka": "ka",
-    "hi": "hi",
-    "no": "da",
-    "tr": "tr",
-    "ko": "ko",
-    "hu": "hu",
-    "be": "mul",
-    "zh": "zh",
-    "ar": "ar",
-    "pl": "pl",
-    "nl": "nl",
-    "th": "th",
-    "sk": "sk",
-    "is": "is",
-    "nb": "gmq",
-    "uk": "uk",
-    "id": "id",
-    "lv": "lv",
-    "sq": "sq",
-    "sw": "mul",
-    "vi": "vi",
-    "el": "grk",
-    "et": "et",
-    "to": "to",
-}
-
-# Batches should be as large as possible,
-# but a batch size that is too large may lead to crashes.
-# 25 works fine on my machine
-MAX_BATCH_SIZE = 25
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.conf import settings
+from django.db import connections
+import os
+import time
+
+from movies.languages import LANGUAGE_MAP
+from movies.models import AlternativeMovieTitle, QuizQuestion, TranslationMemory
+from movies.tasks.workers import init_worker
+
+# Batches should be as large as possible, but a batch that is too large
+# may run out of memory. Titles are sorted by length and packed into
+# batches of at most this many (padded) tokens, a batch that still runs
+# out of memory is split in half.
+MAX_BATCH_TOKENS = 1024
+
+# Titles of one language are split into shards of this size,
+# so several workers can translate a large language
+SHARD_SIZE = 1000
+
+
+def get_model_name(language_code: str) -> str:
+    # https://huggingface.co/docs/transformers/model_doc/marian
+    return f"Helsinki-NLP/opus-mt-{LANGUAGE_MAP[language_code]}-en"
+
+
+class MarianModelRegistry:
+    """
+    Keeps loaded translation models for the lifetime of the process.
+    Language codes that map to the same model share it. The least recently
+    used models are dropped when their size exceeds ``memory_budget`` bytes.
+    """
+
+    def __init__(self, memory_budget: int):
+        self.memory_budget = memory_budget
+        # model name -> (tokenizer, model, size in bytes)
+        self.models = OrderedDict()
+        self.load_count = 0
+        self.load_time = 0.0
+
+    @staticmethod
+    def get_size(model) -> int:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def get_memory_usage(self) -> int:
+        return sum(size for _, _, size in self.models.values())
+
+    def get(self, language_code: str) -> tuple[MarianTokenizer, MarianMTModel]:
+        model_name = get_model_name(language_code)
+        if model_name in self.models:
+            self.models.move_to_end(model_name)
+            tokenizer, model, _ = self.models[model_name]
+            return tokenizer, model
+
+        start = time.perf_counter()
+        # The source language doesn't change how a "*-en" model encodes
+        tokenizer = MarianTokenizer.from_pretrained(
+            model_name,
+            source_lang=language_code,
+            target_lang="en",
+            clean_up_tokenization_spaces=False,
+        )
+        model = MarianMTModel.from_pretrained(model_name)
+        model.eval()
+        self.load_time += time.perf_counter() - start
+        self.load_count += 1
+
+        size = self.get_size(model)
+        while self.models and self.get_memory_usage() + size > self.memory_budget:
+            evicted_name, _ = self.models.popitem(last=False)
+            print(f"Unloading model '{evicted_name}'")
+
+        self.models[model_name] = (tokenizer, model, size)
+        return tokenizer, model
+
+
+def make_batches(items: list, lengths: list[int], max_tokens: int) -> list[list]:
+    """
+    Sort ``items`` by length and pack them into batches whose
+    padded size (batch size * longest length) stays within ``max_tokens``
+    """
+
+    batches = []
+    batch = []
+    for length, item in sorted(zip(lengths, items), key=lambda pair: pair[0]):
+        # Sorted by length: the new item is the longest one in the batch
+        if batch and (len(batch) + 1) * length > max_tokens:
+            batches.append(batch)
+            batch = []
+        batch.append(item)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def is_out_of_memory(error: Exception) -> bool:
+    message = str(error).lower()
+    return isinstance(error, MemoryError) or (
+        "out of memory" in message or "can't allocate memory" in message
+    )
+
+
+def translate(tokenizer, model, titles: list[str]) -> list[str]:
+    """
+    Translate a batch of titles, splitting it when it doesn't fit into memory
+    """
+
+    try:
+        tokens = tokenizer(titles, return_tensors="pt", padding=True)
+        translated = model.generate(**tokens)
+    except (RuntimeError, MemoryError) as e:
+        if len(titles) == 1 or not is_out_of_memory(e):
+            raise
+        half = len(titles) // 2
+        print(f"Out of memory, splitting batch of {len(titles)} titles")
+        return translate(tokenizer, model, titles[:half]) + translate(
+            tokenizer, model, titles[half:]
+        )
+    return [tokenizer.decode(t, skip_special_tokens=True) for t in translated]
+
+
+model_registry = MarianModelRegistry(settings.TRANSLATION_MODEL_MEMORY_MB * 1024 * 1024)
+
+
+def translate_shard(
+    language_code: str, titles: list[str], registry: MarianModelRegistry | None = None
+) -> tuple[list[str], float, float]:
+    """
+    Translate titles of one language.
+    Returns the translations and the seconds spent loading and translating.
+    """
+
+    registry = registry or model_registry
+    load_time = registry.load_time
+    tokenizer, model = registry.get(language_code)
+    load_time = registry.load_time - load_time
+
+    start = time.perf_counter()
+
+    # Titles of similar length are translated together to reduce padding
+    lengths = [len(ids) for ids in tokenizer(titles)["input_ids"]]
+    batches = make_batches(list(range(len(titles))), lengths, MAX_BATCH_TOKENS)
+    print(f"Translating with {get_model_name(language_code)} Batches: {len(batches)}")
+
+    translations = [""] * len(titles)
+    for batch in batches:
+        translated_titles = translate(tokenizer, model, [titles[i] for i in batch])
+        for i, translated_title in zip(batch, translated_titles):
+            translations[i] = translated_title
+
+    return translations, load_time, time.perf_counter() - start
 
 
 class MovieTitleTranslator:
 
-    def __init__(self, movie_titles):
+    def __init__(
+        self,
+        movie_titles,
+        registry: MarianModelRegistry | None = None,
+        workers: int = 1,
+    ):
         self.movie_titles = movie_titles
+        self.registry = registry or model_registry
+        self.workers = workers
+
+    def get_shards(self, texts_by_model: dict) -> list[tuple[str, list[str]]]:
+        """
+        Split the distinct source texts of each model into shards of
+        ``SHARD_SIZE``, labelled with one of the model's language codes
+        """
+
+        shards = []
+        for model_name, title_groups in sorted(texts_by_model.items()):
+            source_texts = list(title_groups)
+            language_code = title_groups[source_texts[0]][0].language_code
+            for i in range(0, len(source_texts), SHARD_SIZE):
+                shards.append((language_code, source_texts[i : i + SHARD_SIZE]))
+        return shards
+
+    def save_translations(self, title_groups: dict, translations: dict) -> int:
+        """
+        Update the titles of every translated source text,
+        return the number of updated titles
+        """
+
+        title_objects = []
+        for source_text, translated_title in translations.items():
+            for title_obj in title_groups[source_text]:
+                title_obj.translated_title = translated_title
+                title_obj.update_translation_difference_ratio()
+                title_objects.append(title_obj)
+
+        # bulk_update() skips the per-title signals, the pool is refreshed once
+        AlternativeMovieTitle.objects.bulk_update(
+            title_objects,
+            ["translated_title", "translation_difference_ratio"],
+            batch_size=1000,
+        )
+
+        # New ratios may add or remove questions
+        QuizQuestion.objects.refresh(m.movie_id for m in title_objects)
+        return len(title_objects)
+
+    def iter_results(self, shards):
+        """
+        Yield each shard with its ``translate_shard`` result, in order of completion
+        """
+
+        if self.workers <= 1:
+            for language_code, source_texts in shards:
+                yield (language_code, source_texts), translate_shard(
+                    language_code, source_texts, self.registry
+                )
+            return
+
+        # Share the CPU cores between the workers' PyTorch thread pools
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+
+        # Forked workers must not inherit open database connections
+        connections.close_all()
+
+        with ProcessPoolExecutor(
+            self.workers,
+            initializer=init_worker,
+            initargs=("torch.set_num_threads", threads),
+        ) as executor:
+            futures = {
+                executor.submit(translate_shard, language_code, source_texts): (
+                    language_code,
+                    source_texts,
+                )
+                for language_code, source_texts in shards
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
 
     def run(self):
 
-        total_count = 0
+        load_time = 0.0
+        inference_time = 0.0
         translated_count = 0
+        # model name -> [source texts, seconds], languages may share a model
+        model_stats = defaultdict(lambda: [0, 0.0])
+        languages_by_model = defaultdict(set)
 
-        # Group titles by language before translating to increase the batch size
-        # Example: {"lang1": [[m1 ... m25], [m26 ... m50]], "lang2": ["m1 ... m10"]]}
-        titles_by_language = {}
+        # Titles by model and normalized source text:
+        # identical titles (also of languages that share a model) are translated once
+        texts_by_model = defaultdict(lambda: defaultdict(list))
+        total_count = 0
         for title_obj in self.movie_titles:
-            if title_obj.language_code in titles_by_language:
-                batches = titles_by_language[title_obj.language_code]
-                if len(batches[-1]) < MAX_BATCH_SIZE:
-                    batches[-1].append(title_obj)
-                else:
-                    batches.append([title_obj])
-            else:
-                titles_by_language[title_obj.language_code] = [[title_obj]]
+            model_name = get_model_name(title_obj.language_code)
+            source_text = TranslationMemory.normalize(title_obj.title)
+            texts_by_model[model_name][source_text].append(title_obj)
+            languages_by_model[model_name].add(title_obj.language_code)
             total_count += 1
 
         print(f"Translating {total_count} movie titles")
 
-        # Translate one language at a time
-        for language_code, batches in titles_by_language.items():
-            print(f"Translating language '{language_code}' Batches: {len(batches)}")
+        # Reuse earlier translations
+        for model_name, title_groups in texts_by_model.items():
+            translations = TranslationMemory.objects.get_translations(
+                model_name, list(title_groups)
+            )
+            translated_count += self.save_translations(title_groups, translations)
+            for source_text in translations:
+                del title_groups[source_text]
+        print(f"Found in translation memory: {translated_count}/{total_count}")
+
+        texts_by_model = {
+            model_name: title_groups
+            for model_name, title_groups in texts_by_model.items()
+            if title_groups
+        }
+        shards = self.get_shards(texts_by_model)
 
-            # https://huggingface.co/docs/transformers/model_doc/marian
-            model_name = f"Helsinki-NLP/opus-mt-{LANGUAGE_MAP[language_code]}-en"
+        # Only this process writes to the database
+        for (language_code, source_texts), result in self.iter_results(shards):
+            translated_titles, shard_load_time, shard_inference_time = result
 
-            tokenizer = MarianTokenizer.from_pretrained(
-                model_name,
-                source_lang=language_code,
-                target_lang="en",
-                clean_up_tokenization_spaces=False,
+            model_name = get_model_name(language_code)
+            translations = dict(zip(source_texts, translated_titles))
+            TranslationMemory.objects.store(model_name, translations)
+            translated_count += self.save_translations(
+                texts_by_model[model_name], translations
             )
-            model = MarianMTModel.from_pretrained(model_name)
 
-            # Translate batches of movie titles
-            for movie_title_objects in batches:
-                print(f"Batch size: {len(movie_title_objects)}")
+            load_time += shard_load_time
+            inference_time += shard_inference_time
+            model_stats[model_name][0] += len(source_texts)
+            model_stats[model_name][1] += shard_inference_time
+            print(f"{translated_count}/{total_count} done.")
 
-                tokens = tokenizer(
-                    [m.title for m in movie_title_objects],
-                    return_tensors="pt",
-                    padding=True,
-                )
-                translated = model.generate(**tokens)
-                translated_titles = [
-                    tokenizer.decode(t, skip_special_tokens=True) for t in translated
-                ]
-
-                # Update the AlternativeMovieTitle objects
-                for title_obj, translated_title in zip(
-                    movie_title_objects, translated_titles
-                ):
-                    title_obj.translated_title = translated_title
-                    # Call save() instead of bulk_update
-                    # to calculate the translation_difference_ratio
-                    title_obj.save()
-
-                translated_count += len(movie_title_objects)
-                print(f"{translated_count}/{total_count} done.")
+        QuizQuestion.objects.rebuild_alias_table()
+
+        for model_name, (count, seconds) in sorted(model_stats.items()):
+            rate = count / seconds if seconds else 0.0
+            language_codes = ", ".join(sorted(languages_by_model[model_name]))
+            print(
+                f"{model_name} ({language_codes}): "
+                f"{count} titles, {rate:.1f} titles/s"
+            )
+        print(f"Loading models: {load_time:.1f}s, inference: {inference_time:.1f}s")
@@ -1,16 +1,34 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime, date
 
-from django.utils.http import urlencode
+from django.db import transaction
+from django.db.models import Max
 
-from movies.models import Person, Movie, AlternativeMovieTitle
+from movies import cache
+from movies.models import (
+    Person,
+    Movie,
+    AlternativeMovieTitle,
+    ImportCheckpoint,
+    QuizQuestion,
+)
+from movies.tasks.client import WikidataClient
 
-import requests
 import time
 
 
 # Wikidata allows a maximum of 50 values per filter
 MOVIES_PER_QUERY = 50
 
+ENTITY_URL = "http://www.wikidata.org/entity/"
+
+# Rows per INSERT when storing a page of movies
+WRITE_BATCH_SIZE = 250
+
+# Properties that refer to other entries: country, directors, cast
+LABEL_PROPERTIES = [("P495", 1), ("P57", 3), ("P161|P725", 5)]
+
 
 def parse_release_date(release_date: str) -> date:
     try:
@@ -20,6 +38,16 @@ def parse_release_date(release_date: str) -> date:
         return None
 
 
+def first(values: list, default=None):
+    return values[0] if values else default
+
+
+def parse_modified(modified: str | None) -> datetime | None:
+    if not modified:
+        return None
+    return datetime.fromisoformat(modified)
+
+
 def parse_duration(duration: str) -> timedelta:
     try:
         minutes = round(float(duration.lstrip("+")))
@@ -34,67 +62,134 @@ class WikidataGraphAPI:
     Create basic ``Movie`` objects via SPARQL querys
     """
 
-    def get_movies(self, offset: int, limit: int) -> list[dict]:
+    # Progress is stored after every page, see ``ImportCheckpoint``
+    CHECKPOINT_NAME = "import_wikidata"
+
+    # Never request more than 500 entries at once
+    MAX_QUERY_LIMIT = 500
+
+    def __init__(self, client: WikidataClient | None = None):
+        self.client = client or WikidataClient()
+
+    def get_movies(self, after: tuple[int, str] | None, limit: int) -> list[dict]:
         """
         Send a request to Wikidata and return the entries
+        that come after the ``(sitelinks, movie_id)`` key ``after``
         """
 
-        print(f"Querying wikidata: offset={offset}, limit={limit}")
+        print(f"Querying wikidata: after={after}, limit={limit}")
+
+        # Keyset pagination: unlike OFFSET the endpoint doesn't have
+        # to skip all previous rows and new movies don't shift the pages
+        keyset_filter = ""
+        if after is not None:
+            sitelinks, movie_id = after
+            sitelinks = int(sitelinks)
+            keyset_filter = (
+                f"FILTER(?sitelinks < {sitelinks} || (?sitelinks = {sitelinks} "
+                f'&& STR(?q) > "{ENTITY_URL}{movie_id}"))'
+            )
 
         # Get the most popular movies on wikidata ("popular": has many sitelinks)
         sparql_query = """
         SELECT ?q ?sitelinks
-        WHERE {{?q wdt:P31 wd:Q11424. ?q wikibase:sitelinks ?sitelinks.}}
-        ORDER BY desc(?sitelinks)
+        WHERE {{
+            ?q wdt:P31 wd:Q11424. ?q wikibase:sitelinks ?sitelinks. {keyset_filter}
+        }}
+        ORDER BY desc(?sitelinks) ?q
         LIMIT {limit}
-        OFFSET {offset}
         """.format(
-            limit=limit, offset=offset
+            limit=limit, keyset_filter=keyset_filter
         )
 
-        wikidata_url = f"https://query.wikidata.org/sparql?" + urlencode(
-            {"query": sparql_query, "format": "json"}
-        )
+        return self.client.sparql(sparql_query)
 
-        response = requests.get(wikidata_url)
-        result = response.json()["results"]["bindings"]
-        return result
+    def parse_movies(self, movie_data: list[dict]) -> list[Movie]:
+        """
+        Turn the SPARQL bindings of one page into unsaved Movie objects
+        """
+
+        movie_objects = []
+        for m in movie_data:
+            movie_id = m["q"]["value"].split("/")[-1]
+            sitelinks = int(m["sitelinks"]["value"])
+            movie_objects.append(Movie(wikidata_id=movie_id, sitelinks=sitelinks))
+        return movie_objects
 
-    def run(self, count: int) -> None:
+    def iter_pages(self, after: tuple[int, str] | None, count: int):
         """
-        Create ``count`` more Movie objects
+        Yield up to ``count`` movies page by page.
+        The next page is already requested while the caller stores the current one.
         """
 
-        # Never request more than 500 entries at once
-        MAX_QUERY_LIMIT = 500
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            remaining = count
+            limit = min(self.MAX_QUERY_LIMIT, remaining)
+            future = executor.submit(self.get_movies, after, limit)
+            while future is not None:
+                movie_objects = self.parse_movies(future.result())
+                if not movie_objects:
+                    print("No more movies")
+                    return
+
+                remaining -= len(movie_objects)
+                future = None
+                if remaining > 0 and len(movie_objects) == limit:
+                    last = movie_objects[-1]
+                    limit = min(self.MAX_QUERY_LIMIT, remaining)
+                    future = executor.submit(
+                        self.get_movies, (last.sitelinks, last.wikidata_id), limit
+                    )
 
-        print(f"Start wikidata download. count={count}")
+                yield movie_objects
 
-        movie_data = []
+    def save_page(self, movie_objects: list[Movie]) -> None:
+        """
+        Upsert one page together with the checkpoint,
+        an interrupted import continues after the last stored page
+        """
 
-        existing_count = Movie.objects.all().count()
-        target_total = existing_count + count
+        last = movie_objects[-1]
+        with transaction.atomic():
+            Movie.objects.bulk_create(
+                movie_objects,
+                batch_size=WRITE_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=["wikidata_id"],
+                update_fields=["sitelinks"],
+            )
+            ImportCheckpoint.set_value(
+                self.CHECKPOINT_NAME,
+                {"sitelinks": last.sitelinks, "wikidata_id": last.wikidata_id},
+            )
 
-        offset = existing_count
-        while offset < target_total:
-            limit = min(MAX_QUERY_LIMIT, target_total - offset)
-            movie_data += self.get_movies(offset, limit)
-            offset += limit
+    def run(self, count: int, restart: bool = False) -> None:
+        """
+        Create ``count`` more Movie objects,
+        continuing after the last imported page
+        """
 
-        print(f"Number of elements: {len(movie_data)}")
+        print(f"Start wikidata download. count={count}")
 
-        movie_objects = []
-        for m in movie_data:
-            movie_id = m["q"]["value"].split("/")[-1]
-            sitelinks = int(m["sitelinks"]["value"])
-            movie_objects.append(Movie(wikidata_id=movie_id, sitelinks=sitelinks))
+        if restart:
+            ImportCheckpoint.reset(self.CHECKPOINT_NAME)
 
-        Movie.objects.bulk_create(
-            movie_objects,
-            update_conflicts=True,
-            unique_fields=["wikidata_id"],
-            update_fields=["sitelinks"],
-        )
+        checkpoint = ImportCheckpoint.get_value(self.CHECKPOINT_NAME)
+        after = None
+        if checkpoint is not None:
+            after = (checkpoint["sitelinks"], checkpoint["wikidata_id"])
+
+        # Only the current and the next page are kept in memory
+        imported_count = 0
+        for movie_objects in self.iter_pages(after, count):
+            self.save_page(movie_objects)
+            imported_count += len(movie_objects)
+            print(f"Number of elements: {imported_count}")
+
+        cache.invalidate()
+
+        # Popularity weights depend on the sitelinks
+        QuizQuestion.objects.rebuild_alias_table()
 
 
 class WikidataAPI:
@@ -103,169 +198,481 @@ class WikidataAPI:
     that were created with ``WikidataSparqlAPI``
     """
 
-    def __init__(self, movies):
+    def __init__(
+        self,
+        movies,
+        client: WikidataClient | None = None,
+        checkpoint_name: str | None = None,
+    ):
         self.movies = movies
+        self.client = client or WikidataClient()
 
-    def send_request(self, url, params={}):
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
-            raise Exception("Error: " + str(response.status_code))
-        response_json = response.json()
-        if "error" in response_json:
-            raise Exception(response_json["error"]["info"])
-        return response_json
+        # Progress is stored after every batch, see ``ImportCheckpoint``
+        self.checkpoint_name = checkpoint_name
+
+        # Country labels by Wikidata-ID, shared by all batches (people are
+        # looked up in the ``Person`` table, so memory doesn't grow with it)
+        self.labels = {}
+
+    def send_request(self, params={}):
+        return self.client.api(params)
 
     def get_propertys_for_ids(self, ids=[], extra_props=[], language=None):
         params = {
             "action": "wbgetentities",
             "ids": "|".join(ids),
             "props": "|".join(["labels", "descriptions"] + extra_props),
-            "format": "json",
         }
 
         if language is not None:
             params["languages"] = language
             params["languagefallback"] = "true"
 
-        response = self.send_request("https://www.wikidata.org/w/api.php", params)
+        response = self.send_request(params)
         if "entities" not in response:
             print("Error! Missing entities in response")
             print(response.keys())
             return {}
         return response["entities"]
 
+    def get_claim_values(
+        self, movie_data: dict, property_ids: str, limit: int = 10
+    ) -> list[dict]:
+        """
+        Return the raw values of up to ``limit`` claims per property
+        """
+
+        values = []
+        for property_id in property_ids.split("|"):
+            if property_id in movie_data["claims"]:
+
+                claims = movie_data["claims"][property_id][:limit]
+
+                for claim in claims:
+                    if "datavalue" not in claim["mainsnak"]:
+                        continue
+                    values.append(claim["mainsnak"]["datavalue"]["value"])
+        return values
+
+    def get_labels(self, ids: list[str]) -> dict[str, str]:
+        """
+        Return the English labels of the given Wikidata entries.
+        Known labels come from ``self.labels`` and the names of stored people,
+        the rest is fetched in chunks of ``MOVIES_PER_QUERY``.
+        """
+
+        labels = {}
+        missing = []
+        for wikidata_id in dict.fromkeys(ids):
+            if wikidata_id in self.labels:
+                labels[wikidata_id] = self.labels[wikidata_id]
+            else:
+                missing.append(wikidata_id)
+
+        if missing:
+            labels.update(
+                Person.objects.filter(wikidata_id__in=missing)
+                .exclude(name="")
+                .values_list("wikidata_id", "name")
+            )
+            missing = [i for i in missing if i not in labels]
+
+        fetched = {}
+        for i in range(0, len(missing), MOVIES_PER_QUERY):
+            chunk = missing[i : i + MOVIES_PER_QUERY]
+            response = self.get_propertys_for_ids(chunk, language="en")
+            for d in response.values():
+                if "en" in d.get("labels", {}):
+                    fetched[d["id"]] = d["labels"]["en"]["value"]
+
+        labels.update(fetched)
+        return labels
+
     def get_property_values(
         self,
         movie_data: dict,
         property_ids: str,
         limit: int = 10,
         label_only: bool = True,
+        labels: dict[str, str] | None = None,
     ) -> list[str | timedelta | date | dict]:
         """
         Read property values from `movie_data` and return them as a list.
         Properties that refer to other Wikidata pages (e.g., Director)
-        are fetched with a separate API request.
+        are resolved with ``labels`` or ``get_labels``.
         """
 
         values = []
         claim_value_ids = []
 
-        for property_id in property_ids.split("|"):
-            if property_id in movie_data["claims"]:
-
-                claims = movie_data["claims"][property_id][:limit]
-
-                for claim in claims:
-                    if "datavalue" not in claim["mainsnak"]:
-                        continue
-                    claim = claim["mainsnak"]["datavalue"]["value"]
-                    if "id" in claim:
-                        claim_value_ids.append(claim["id"])
-                    elif "amount" in claim:
-                        values.append(parse_duration(claim["amount"]))
-                    elif "time" in claim:
-                        values.append(parse_release_date(claim["time"]))
+        for claim in self.get_claim_values(movie_data, property_ids, limit):
+            if "id" in claim:
+                claim_value_ids.append(claim["id"])
+            elif "amount" in claim:
+                values.append(parse_duration(claim["amount"]))
+            elif "time" in claim:
+                values.append(parse_release_date(claim["time"]))
 
         # Use the ids to get more details about these entries
         if claim_value_ids:
-            response = self.get_propertys_for_ids(claim_value_ids, language="en")
-            for d in response.values():
-                label = d["labels"]["en"]["value"]
+            if labels is None:
+                labels = self.get_labels(claim_value_ids)
+            for wikidata_id in claim_value_ids:
+                if wikidata_id not in labels:
+                    continue
+                label = labels[wikidata_id]
                 if label_only:
                     values.append(label)
                 else:
-                    values.append({"id": d["id"], "label": label})
+                    values.append({"id": wikidata_id, "label": label})
         return values
 
     def get_movie_data(self, movie_ids: list[str]) -> dict:
         """
         Get information about movies
         """
-        movie_list = self.get_propertys_for_ids(movie_ids, extra_props=["claims"])
-
-        result = {}
-        for movie_id, movie_data in movie_list.items():
-            result[movie_id] = {
-                "labels": movie_data["labels"],
-                "description": movie_data["descriptions"]["en"]["value"],
-                "country": self.get_property_values(movie_data, "P495", limit=1)[0],
-                "date": self.get_property_values(movie_data, "P577", limit=1)[0],
-                "directors": self.get_property_values(
-                    movie_data, "P57", limit=3, label_only=False
-                ),
-                "duration": self.get_property_values(movie_data, "P2047", limit=1)[0],
-                "cast": self.get_property_values(
-                    movie_data, "P161|P725", limit=5, label_only=False
-                ),  # cast members & voice actors
-            }
-        return result
-
-    def run(self) -> None:
-        movie_count = self.movies.count()
-
-        for i in range(0, movie_count, MOVIES_PER_QUERY):
-            print(f"Downloading... {i}-{i+MOVIES_PER_QUERY}/{movie_count}")
-
-            batch = self.movies[i : i + MOVIES_PER_QUERY]
-            alternative_title_objects = []
-            person_objects = []
-
-            movies_json = self.get_movie_data([m.wikidata_id for m in batch])
-            for movie in batch:
-                movie_data = movies_json.get(movie.wikidata_id, None)
-                if movie_data is None:
-                    print("Error! Movie not found")
-                    continue
+        movie_list = self.get_propertys_for_ids(
+            movie_ids, extra_props=["claims", "info"]
+        )
 
-                english_title = movie_data["labels"]["en"]["value"]
-                print(f"Updating movie: {english_title}")
-
-                movie.english_title = english_title
-                movie.description = movie_data["description"]
-                movie.release_date = movie_data["date"]
-                movie.duration = movie_data["duration"]
-
-                for actor in movie_data["cast"]:
-                    actor_object = Person.objects.get_or_create(
-                        wikidata_id=actor["id"]
-                    )[0]
-                    actor_object.name = actor["label"]
-                    person_objects.append(actor_object)
-                    movie.cast.add(actor_object)
-
-                for director in movie_data["directors"]:
-                    director_object = Person.objects.get_or_create(
-                        wikidata_id=director["id"]
-                    )[0]
-                    director_object.name = director["label"]
-                    person_objects.append(director_object)
-                    movie.directed_by.add(director_object)
-
-                for alternative_title in movie_data["labels"].values():
-                    # Exclude country-specific titles and the ones that don't differ from the English version
-                    if (
-                        alternative_title == movie.english_title
-                        or "-" in alternative_title["language"]
-                    ):
-                        continue
+        # Resolve the referenced entries of the whole batch at once
+        referenced_ids = []
+        for movie_data in movie_list.values():
+            referenced_ids.extend(self.get_referenced_ids(movie_data))
+        labels = self.get_labels(referenced_ids)
+
+        # Countries aren't stored, the few of them are kept for later batches
+        for movie_data in movie_list.values():
+            for claim in self.get_claim_values(movie_data, "P495", limit=1):
+                if claim.get("id") in labels:
+                    self.labels[claim["id"]] = labels[claim["id"]]
+
+        return {
+            movie_id: self.parse_movie(movie_data, labels)
+            for movie_id, movie_data in movie_list.items()
+        }
 
-                    title_object, created = AlternativeMovieTitle.objects.get_or_create(
-                        movie=movie,
-                        language_code=alternative_title["language"],
-                    )
-                    title_object.title = alternative_title["value"]
-                    title_object.translated_title = ""
-                    alternative_title_objects.append(title_object)
+    def get_referenced_ids(self, movie_data: dict) -> list[str]:
+        """
+        Ids of the entries a movie refers to (country, directors, cast)
+        """
+        return [
+            claim["id"]
+            for property_ids, limit in LABEL_PROPERTIES
+            for claim in self.get_claim_values(movie_data, property_ids, limit)
+            if "id" in claim
+        ]
+
+    def parse_movie(self, movie_data: dict, labels: dict[str, str]) -> dict:
+        """
+        Extract the details of a movie from its Wikidata entity
+        """
+        return {
+            "labels": movie_data["labels"],
+            "description": movie_data["descriptions"].get("en", {}).get("value", ""),
+            "lastrevid": movie_data.get("lastrevid", 0),
+            "modified": parse_modified(movie_data.get("modified")),
+            "country": first(
+                self.get_property_values(movie_data, "P495", limit=1, labels=labels)
+            ),
+            "date": first(self.get_property_values(movie_data, "P577", limit=1)),
+            "directors": self.get_property_values(
+                movie_data, "P57", limit=3, label_only=False, labels=labels
+            ),
+            "duration": first(
+                self.get_property_values(movie_data, "P2047", limit=1),
+                timedelta(minutes=0),
+            ),
+            "cast": self.get_property_values(
+                movie_data, "P161|P725", limit=5, label_only=False, labels=labels
+            ),  # cast members & voice actors
+        }
+
+    def save_credits(
+        self,
+        people: dict[str, str],
+        cast: list[tuple[int, str]],
+        directors: list[tuple[int, str]],
+    ) -> None:
+        """
+        Upsert ``people`` (names by Wikidata-ID) and add the
+        ``(movie id, person Wikidata-ID)`` credits in a fixed number of queries
+        """
 
-            # Bulk update database objects
-            Person.objects.bulk_update(person_objects, ["name"])
+        if not people:
+            return
+
+        Person.objects.bulk_create(
+            [Person(wikidata_id=i, name=name) for i, name in people.items() if name],
+            batch_size=WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["wikidata_id"],
+            update_fields=["name"],
+        )
+        # People without a known name yet keep the stored one
+        Person.objects.bulk_create(
+            [Person(wikidata_id=i) for i, name in people.items() if not name],
+            batch_size=WRITE_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        person_ids = dict(
+            Person.objects.filter(wikidata_id__in=people).values_list(
+                "wikidata_id", "id"
+            )
+        )
 
-            AlternativeMovieTitle.objects.bulk_update(
-                alternative_title_objects, ["title"]
+        for through, credits in (
+            (Movie.cast.through, cast),
+            (Movie.directed_by.through, directors),
+        ):
+            through.objects.bulk_create(
+                [
+                    through(movie_id=movie_id, person_id=person_ids[wikidata_id])
+                    for movie_id, wikidata_id in dict.fromkeys(credits)
+                ],
+                batch_size=WRITE_BATCH_SIZE,
+                ignore_conflicts=True,
             )
 
-            Movie.objects.bulk_update(
-                batch, ["english_title", "description", "release_date", "duration"]
+    def fetch_batch(self, batch: list[Movie]) -> dict:
+        """
+        Download the details of a batch (runs in a worker thread)
+        """
+        return self.get_movie_data([m.wikidata_id for m in batch])
+
+    def save_titles(self, titles: dict[tuple[int, str], str]) -> None:
+        """
+        Upsert the alternative titles by ``(movie id, language code)``.
+        Only new and changed titles are written, which also resets their
+        translation so ``translate_movie_titles`` picks them up again.
+        """
+
+        if not titles:
+            return
+
+        movie_ids = {movie_id for movie_id, _ in titles}
+        existing = {
+            (movie_id, language_code): title
+            for movie_id, language_code, title in AlternativeMovieTitle.objects.filter(
+                movie_id__in=movie_ids
+            ).values_list("movie_id", "language_code", "title")
+        }
+
+        AlternativeMovieTitle.objects.bulk_create(
+            [
+                AlternativeMovieTitle(
+                    movie_id=movie_id,
+                    language_code=language_code,
+                    title=title,
+                    translated_title="",
+                )
+                for (movie_id, language_code), title in titles.items()
+                if existing.get((movie_id, language_code)) != title
+            ],
+            batch_size=WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["movie", "language_code"],
+            update_fields=["title", "translated_title", "translation_difference_ratio"],
+        )
+
+    def save_batch(self, batch: list[Movie], movies_json: dict) -> None:
+        """
+        Store the downloaded details of one batch of movies
+        """
+
+        titles = {}
+        people = {}
+        cast = []
+        directors = []
+
+        for movie in batch:
+            movie_data = movies_json.get(movie.wikidata_id, None)
+            if movie_data is None:
+                print("Error! Movie not found")
+                continue
+
+            # The revision is stored in any case, movies without an English title
+            # are only requested again by ``WikidataRefreshAPI`` once they change
+            movie.lastrevid = movie_data["lastrevid"]
+            movie.modified = movie_data["modified"]
+
+            if "en" not in movie_data["labels"]:
+                print(f"Skipping movie without English title: {movie.wikidata_id}")
+                continue
+
+            english_title = movie_data["labels"]["en"]["value"]
+            print(f"Updating movie: {english_title}")
+
+            movie.english_title = english_title
+            movie.description = movie_data["description"]
+            movie.release_date = movie_data["date"]
+            movie.duration = movie_data["duration"]
+
+            for actor in movie_data["cast"]:
+                people[actor["id"]] = actor["label"]
+                cast.append((movie.id, actor["id"]))
+
+            for director in movie_data["directors"]:
+                people[director["id"]] = director["label"]
+                directors.append((movie.id, director["id"]))
+
+            for alternative_title in movie_data["labels"].values():
+                # Exclude country-specific titles and the ones that don't differ from the English version
+                if (
+                    alternative_title["value"] == movie.english_title
+                    or "-" in alternative_title["language"]
+                ):
+                    continue
+
+                key = (movie.id, alternative_title["language"])
+                titles[key] = alternative_title["value"]
+
+        # Bulk update database objects
+        self.save_credits(people, cast, directors)
+        self.save_titles(titles)
+
+        # An upsert avoids the large CASE expressions of ``bulk_update``
+        Movie.objects.bulk_create(
+            batch,
+            batch_size=WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["wikidata_id"],
+            update_fields=[
+                "english_title",
+                "description",
+                "release_date",
+                "duration",
+                "lastrevid",
+                "modified",
+            ],
+        )
+
+        QuizQuestion.objects.refresh(m.id for m in batch)
+        cache.invalidate()
+
+    def save_next(self, pending: deque) -> None:
+        """
+        Store the oldest pending batch and remember the progress
+        """
+
+        batch, future = pending.popleft()
+        self.save_batch(batch, future.result())
+
+        if self.checkpoint_name is not None:
+            ImportCheckpoint.set_value(
+                self.checkpoint_name,
+                {"last_id": batch[-1].id, "max_id": self.max_id},
             )
 
-            time.sleep(1)
+        self.done_count += len(batch)
+        elapsed = time.monotonic() - self.started_at
+        rate = self.done_count / elapsed if elapsed else 0.0
+        eta = (self.movie_count - self.done_count) / rate if rate else 0.0
+        print(
+            f"Downloading... {self.done_count}/{self.movie_count} "
+            f"({rate:.1f} movies/s, ETA {timedelta(seconds=round(eta))})"
+        )
+
+    def get_movie_ids(self, count: int | None, restart: bool) -> list[int]:
+        """
+        Freeze the ids of the movies to download, ordered by id.
+        A stored checkpoint continues after the last finished batch.
+        """
+
+        if self.checkpoint_name is not None and restart:
+            ImportCheckpoint.reset(self.checkpoint_name)
+
+        checkpoint = None
+        if self.checkpoint_name is not None:
+            checkpoint = ImportCheckpoint.get_value(self.checkpoint_name)
+
+        if checkpoint is None:
+            # Movies created during the import are left for the next run
+            last_id = 0
+            self.max_id = self.movies.aggregate(max_id=Max("id"))["max_id"] or 0
+        else:
+            last_id = checkpoint["last_id"]
+            self.max_id = checkpoint["max_id"]
+            print(f"Continuing after movie {last_id}")
+
+        ids = self.movies.filter(id__gt=last_id, id__lte=self.max_id).order_by("id")
+        ids = ids.values_list("id", flat=True)
+        if count is not None:
+            ids = ids[:count]
+        return list(ids)
+
+    def run(
+        self, count: int | None = None, concurrency: int = 1, restart: bool = False
+    ) -> None:
+        """
+        Download the details of up to ``count`` movies, keeping up to
+        ``concurrency`` batches in flight. Only the calling thread writes
+        to the database.
+        """
+
+        # A frozen id list: updated movies may no longer match the queryset
+        movie_ids = self.get_movie_ids(count, restart)
+        self.movie_count = len(movie_ids)
+        self.done_count = 0
+        self.started_at = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = deque()
+            for i in range(0, self.movie_count, MOVIES_PER_QUERY):
+                batch_ids = movie_ids[i : i + MOVIES_PER_QUERY]
+                batch = list(Movie.objects.filter(id__in=batch_ids).order_by("id"))
+                if not batch:
+                    continue
+                future = executor.submit(self.fetch_batch, batch)
+                pending.append((batch, future))
+
+                # Write the oldest batch while the others are downloading
+                if len(pending) >= concurrency:
+                    self.save_next(pending)
+
+            while pending:
+                self.save_next(pending)
+
+        # Everything up to the frozen maximum is done
+        if self.checkpoint_name is not None and (
+            count is None or self.movie_count < count
+        ):
+            ImportCheckpoint.reset(self.checkpoint_name)
+
+        QuizQuestion.objects.rebuild_alias_table()
+
+
+class WikidataRefreshAPI(WikidataAPI):
+    """
+    Update movies whose Wikidata entry changed since the last import
+    """
+
+    def get_revisions(self, movie_ids: list[str]) -> dict[str, int]:
+        """
+        Get the current revision ids without labels or claims
+        """
+        response = self.send_request(
+            {"action": "wbgetentities", "ids": "|".join(movie_ids), "props": "info"}
+        )
+        return {
+            movie_id: entity["lastrevid"]
+            for movie_id, entity in response.get("entities", {}).items()
+            if "lastrevid" in entity
+        }
+
+    def fetch_batch(self, batch: list[Movie]) -> dict:
+        revisions = self.get_revisions([m.wikidata_id for m in batch])
+        changed_ids = [
+            m.wikidata_id
+            for m in batch
+            if m.wikidata_id in revisions and revisions[m.wikidata_id] != m.lastrevid
+        ]
+        if not changed_ids:
+            return {}
+        return self.get_movie_data(changed_ids)
+
+    def save_batch(self, batch: list[Movie], movies_json: dict) -> None:
+        changed = [m for m in batch if m.wikidata_id in movies_json]
+        if changed:
+            print(f"Changed movies: {len(changed)}/{len(batch)}")
+            super().save_batch(changed, movies_json)
@@ -0,0 +1,15 @@
+import django
+from django.utils.module_loading import import_string
+
+# Process pools get ``init_worker`` from this module, which must not import
+# models: spawned workers unpickle the initializer before Django is set up.
+
+
+def init_worker(initializer: str | None = None, *initargs) -> None:
+    """
+    Set up Django in a worker process, then call ``initializer``,
+    given as a dotted path because it may live in a module that uses models
+    """
+    django.setup()
+    if initializer is not None:
+        import_string(initializer)(*initargs)
@@ -1,3 +1,405 @@
-from django.test import TestCase
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache as django_cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from movies import cache as quiz_cache
+from movies.models import (
+    AlternativeMovieTitle,
+    Movie,
+    QuizQuestion,
+    QuizQuestionLanguage,
+    fill_positions,
+)
+from movies.tasks.client import WikidataClient, WikidataError
+from movies.tasks.wikidata import WikidataAPI
+
+# Keep the shared default cache (pool sizes, pages) out of the tests
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+ELIGIBLE_RATIO = 0.5
+INELIGIBLE_RATIO = 0.0
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QuizQuestionPoolTestCase(TestCase):
+
+    def create_movie(self, number: int, language_codes=("de", "fr")) -> Movie:
+        movie = Movie.objects.create(
+            wikidata_id=f"Q{number}",
+            english_title=f"Movie {number}",
+            sitelinks=number,
+        )
+        AlternativeMovieTitle.objects.bulk_create(
+            AlternativeMovieTitle(
+                movie=movie,
+                language_code=code,
+                title=f"Film {number} {code}",
+                translated_title=f"Film {number}",
+                translation_difference_ratio=ELIGIBLE_RATIO,
+            )
+            for code in language_codes
+        )
+        return movie
+
+    def set_ratio(self, movies, ratio: float) -> None:
+        AlternativeMovieTitle.objects.filter(movie__in=movies).update(
+            translation_difference_ratio=ratio
+        )
+
+    def assertDense(self, queryset):
+        positions = sorted(queryset.values_list("position", flat=True))
+        self.assertEqual(positions, list(range(len(positions))))
+
+    def assertPoolConsistent(self):
+        self.assertDense(QuizQuestion.objects.all())
+
+        # One question per movie with eligible titles, holding exactly these titles
+        eligible = QuizQuestion.objects._collect_titles()
+        questions = dict(QuizQuestion.objects.values_list("movie_id", "titles"))
+        self.assertEqual(questions, eligible)
+
+        # Language pools match the questions' titles and are dense per language
+        expected = {
+            (question.id, code)
+            for question in QuizQuestion.objects.all()
+            for code in question.get_language_codes()
+        }
+        entries = set(
+            QuizQuestionLanguage.objects.values_list("question_id", "language_code")
+        )
+        self.assertEqual(entries, expected)
+        for code in {code for _, code in expected}:
+            self.assertDense(QuizQuestionLanguage.objects.filter(language_code=code))
+
+        # Aliases point at existing positions
+        positions = set(QuizQuestion.objects.values_list("position", flat=True))
+        aliases = set(
+            QuizQuestion.objects.exclude(alias_position=None).values_list(
+                "alias_position", flat=True
+            )
+        )
+        self.assertLessEqual(aliases, positions)
+
+
+class FillPositionsTests(QuizQuestionPoolTestCase):
+
+    def setUp(self):
+        self.movies = [self.create_movie(number) for number in range(6)]
+        QuizQuestion.objects.rebuild()
+
+    def delete_questions(self, positions: list[int]) -> None:
+        QuizQuestion.objects.filter(position__in=positions).delete()
+
+    def test_new_objects_take_free_positions_first(self):
+        self.delete_questions([1, 3])
+        new_questions = [
+            QuizQuestion(movie=self.create_movie(number)) for number in (10, 11, 12)
+        ]
+
+        moves = fill_positions(QuizQuestion.objects.all(), new_questions, [3, 1])
+
+        self.assertEqual([q.position for q in new_questions], [1, 3, 6])
+        self.assertEqual(moves, [])
+        self.assertDense(QuizQuestion.objects.all())
+
+    def test_gaps_are_filled_with_last_entries(self):
+        self.delete_questions([0, 2])
+
+        moves = fill_positions(QuizQuestion.objects.all(), [], [0, 2])
+
+        self.assertEqual(moves, [(5, 0), (4, 2)])
+        self.assertDense(QuizQuestion.objects.all())
+
+    def test_gaps_after_the_last_entry_are_dropped(self):
+        self.delete_questions([4, 5])
+
+        moves = fill_positions(QuizQuestion.objects.all(), [], [4, 5])
+
+        self.assertEqual(moves, [])
+        self.assertDense(QuizQuestion.objects.all())
+
+
+class QuizQuestionRefreshTests(QuizQuestionPoolTestCase):
+
+    def setUp(self):
+        self.movies = [self.create_movie(number) for number in range(1, 21)]
+        QuizQuestion.objects.rebuild()
+
+    def test_rebuild(self):
+        self.assertEqual(QuizQuestion.objects.count(), 20)
+        self.assertPoolConsistent()
+
+    def test_removed_questions_keep_pool_dense(self):
+        removed = self.movies[::3]
+        self.set_ratio(removed, INELIGIBLE_RATIO)
+
+        QuizQuestion.objects.refresh(movie.id for movie in removed)
+
+        self.assertFalse(QuizQuestion.objects.filter(movie__in=removed).exists())
+        self.assertPoolConsistent()
+
+    def test_added_questions_take_free_positions(self):
+        removed = self.movies[:2]
+        self.set_ratio(removed, INELIGIBLE_RATIO)
+        QuizQuestion.objects.refresh(movie.id for movie in removed)
+
+        added = [self.create_movie(number) for number in (30, 31, 32)]
+        QuizQuestion.objects.refresh(movie.id for movie in added)
+
+        self.assertEqual(QuizQuestion.objects.count(), 21)
+        self.assertPoolConsistent()
+
+    def test_changed_titles_update_language_pools(self):
+        movie = self.movies[0]
+        AlternativeMovieTitle.objects.filter(movie=movie, language_code="de").update(
+            translation_difference_ratio=INELIGIBLE_RATIO
+        )
+
+        QuizQuestion.objects.refresh([movie.id])
+
+        self.assertEqual(movie.quiz_question.get_language_codes(), {"fr"})
+        self.assertPoolConsistent()
+
+    def test_aliases_follow_moved_questions(self):
+        def alias_movies():
+            movie_ids = dict(QuizQuestion.objects.values_list("position", "movie_id"))
+            return {
+                movie_id: movie_ids.get(alias_position)
+                for movie_id, alias_position in QuizQuestion.objects.values_list(
+                    "movie_id", "alias_position"
+                )
+            }
+
+        before = alias_movies()
+        removed = self.movies[:5]
+        self.set_ratio(removed, INELIGIBLE_RATIO)
+
+        QuizQuestion.objects.refresh(movie.id for movie in removed)
+
+        removed_ids = {movie.id for movie in removed}
+        expected = {
+            movie_id: None if alias_movie_id in removed_ids else alias_movie_id
+            for movie_id, alias_movie_id in before.items()
+            if movie_id not in removed_ids
+        }
+        self.assertEqual(alias_movies(), expected)
+        self.assertPoolConsistent()
+
+
+class QuizQuestionLanguageSyncTests(QuizQuestionPoolTestCase):
+
+    def setUp(self):
+        for number in range(1, 11):
+            self.create_movie(number, language_codes=("de", "fr", "ja"))
+        QuizQuestion.objects.rebuild()
+        self.questions = list(QuizQuestion.objects.order_by("position"))
+
+    def test_removed_languages_keep_positions_dense(self):
+        QuizQuestionLanguage.objects.sync(
+            {question.id: {"ja"} for question in self.questions[:4]}
+        )
+
+        for code, count in [("de", 6), ("fr", 6), ("ja", 10)]:
+            entries = QuizQuestionLanguage.objects.filter(language_code=code)
+            self.assertEqual(entries.count(), count)
+            self.assertDense(entries)
+
+    def test_added_languages_are_appended(self):
+        QuizQuestionLanguage.objects.sync(
+            {question.id: {"de", "fr", "ja", "ko"} for question in self.questions[:3]}
+        )
+
+        entries = QuizQuestionLanguage.objects.filter(language_code="ko")
+        self.assertEqual(entries.count(), 3)
+        self.assertDense(entries)
+        self.assertEqual(QuizQuestionLanguage.objects.count(), 33)
+
+
+class TitleSignalTests(QuizQuestionPoolTestCase):
+
+    def setUp(self):
+        self.movies = [self.create_movie(number) for number in range(1, 11)]
+        QuizQuestion.objects.rebuild()
+
+    def test_edited_titles_refresh_the_pool(self):
+        movie = self.movies[0]
+        for title in movie.alternative_titles.all():
+            # Same text as the English title: too similar for the quiz
+            title.translated_title = movie.english_title
+            title.save()
+
+        self.assertFalse(QuizQuestion.objects.filter(movie=movie).exists())
+        self.assertPoolConsistent()
+
+    def test_deleted_titles_refresh_the_pool(self):
+        movie = self.movies[3]
+        movie.alternative_titles.get(language_code="de").delete()
+
+        self.assertEqual(movie.quiz_question.get_language_codes(), {"fr"})
+        self.assertPoolConsistent()
+
+    def test_deleted_movies_keep_pool_consistent(self):
+        self.movies[2].delete()
+
+        self.assertEqual(QuizQuestion.objects.count(), 9)
+        self.assertPoolConsistent()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheTests(TestCase):
+
+    def test_evicted_generation_does_not_revive_old_entries(self):
+        quiz_cache.get_or_set("question", lambda: "old")
+        quiz_cache.invalidate()
+        # E.g. culled by the file cache
+        django_cache.delete(quiz_cache.GENERATION_KEY)
+
+        self.assertEqual(quiz_cache.get_or_set("question", lambda: "new"), "new")
+
+    def test_hits_and_misses_are_added_in_batches(self):
+        quiz_cache.reset_stats()
+        for _ in range(quiz_cache.STATS_FLUSH_COUNT - 1):
+            quiz_cache.get_or_set("question", lambda: "value")
+        self.assertEqual(quiz_cache.get_stats()["hits"], 0)
+
+        quiz_cache.get_or_set("question", lambda: "value")
+        stats = quiz_cache.get_stats()
+        self.assertEqual(stats["hits"] + stats["misses"], quiz_cache.STATS_FLUSH_COUNT)
+
+
+class FakeWikidataHandler(BaseHTTPRequestHandler):
+    """
+    Answers with the queued ``(status, headers, json)`` responses in order
+    """
+
+    def do_GET(self):
+        server = self.server
+        server.paths.append(self.path)
+        status, headers, body = server.responses.pop(0)
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WikidataClientTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeWikidataHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/w/api.php"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.responses = []
+        self.server.paths = []
+
+    def respond(self, *responses):
+        self.server.responses.extend(responses)
+
+    def create_client(self, **kwargs) -> WikidataClient:
+        kwargs = {
+            "api_url": self.url,
+            "requests_per_second": 0,
+            "max_retries": 2,
+            "cache_mode": "off",
+            **kwargs,
+        }
+        client = WikidataClient(**kwargs)
+        # No random waits between retries
+        client.backoff = mock.Mock(return_value=0)
+        return client
+
+    def test_retry_after_pauses_before_the_retry(self):
+        self.respond((429, {"Retry-After": "0.3"}, {}), (200, {}, {"ok": 1}))
+        client = self.create_client()
+
+        start = time.monotonic()
+        self.assertEqual(client.api({"action": "query"}), {"ok": 1})
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        self.assertEqual(len(self.server.paths), 2)
+        client.backoff.assert_not_called()
+
+    def test_unavailable_responses_are_retried(self):
+        self.respond((503, {}, {}), (503, {}, {}), (200, {}, {"ok": 1}))
+        client = self.create_client()
+
+        self.assertEqual(client.api({"action": "query"}), {"ok": 1})
+        self.assertEqual(len(self.server.paths), 3)
+
+    def test_last_unavailable_response_raises(self):
+        self.respond(*[(503, {}, {})] * 3)
+        client = self.create_client()
+
+        with self.assertRaisesMessage(WikidataError, "503"):
+            client.api({"action": "query"})
+        self.assertEqual(len(self.server.paths), 3)
+
+    def test_maxlag_error_is_retried_then_raised(self):
+        lagged = {"error": {"code": "maxlag", "info": "Waiting for replicas"}}
+        self.respond(*[(200, {"Retry-After": "0"}, lagged)] * 3)
+        client = self.create_client(maxlag=5)
+
+        with self.assertRaisesMessage(WikidataError, "Waiting for replicas"):
+            client.api({"action": "query"})
+        self.assertEqual(len(self.server.paths), 3)
+        self.assertIn("maxlag=5", self.server.paths[0])
+
+    def test_replay_fails_on_unrecorded_requests(self):
+        self.respond((200, {}, {"ok": 1}))
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with override_settings(WIKIDATA_CACHE_DIR=cache_dir):
+                self.create_client(cache_mode="record").api({"action": "query"})
+                client = self.create_client(cache_mode="replay")
+
+                self.assertEqual(client.api({"action": "query"}), {"ok": 1})
+                with self.assertRaisesMessage(WikidataError, "not recorded"):
+                    client.api({"action": "parse"})
+        self.assertEqual(len(self.server.paths), 1)
+
+
+class SaveTitlesTests(QuizQuestionPoolTestCase):
+
+    def test_unchanged_titles_keep_their_translation(self):
+        movie = self.create_movie(1)
+        importer = WikidataAPI(Movie.objects.none(), client=mock.Mock())
+
+        importer.save_titles(
+            {
+                (movie.id, "de"): "Film 1 de",
+                (movie.id, "fr"): "Nouveau film",
+                (movie.id, "ja"): "映画",
+            }
+        )
+
+        titles = {
+            title.language_code: title for title in movie.alternative_titles.all()
+        }
+        self.assertEqual(titles["de"].translated_title, "Film 1")
+        self.assertEqual(titles["de"].translation_difference_ratio, ELIGIBLE_RATIO)
+        self.assertEqual(titles["fr"].title, "Nouveau film")
+        self.assertEqual(titles["fr"].translated_title, "")
+        self.assertEqual(titles["ja"].translated_title, "")
@@ -2,6 +2,7 @@ from pathlib import Path
 
 import environ
 import os
+import tempfile
 
 
 env = environ.Env(DEBUG=(bool, False))
@@ -68,6 +69,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "quiz.wsgi.application"
 
+# Serve the quiz and the hot API endpoints with async views,
+# enable when running under ASGI (e.g. uvicorn quiz.asgi:application)
+ASYNC_VIEWS = env.bool("ASYNC_VIEWS", default=False)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -80,6 +85,60 @@ DATABASES = {
 }
 
 
+# Cache for quiz questions and API pages
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# CACHE_URL examples: "filecache:///var/tmp/quiz-cache", "redis://127.0.0.1:6379/0"
+# The cache must be shared by all processes: the management commands
+# invalidate it and ``cache_stats`` reads the counters of the web workers.
+# A local-memory cache ("locmemcache://") is only suitable for a single process.
+
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "movie-title-quiz-cache"
+CACHES = {
+    "default": env.cache(
+        "CACHE_URL", default=f"filecache://{DEFAULT_CACHE_DIR}?MAX_ENTRIES=10000"
+    )
+}
+
+# Seconds a cached question or API page stays valid
+QUIZ_CACHE_TIMEOUT = env.int("QUIZ_CACHE_TIMEOUT", default=300)
+
+# Sampling weight of a movie in the "popular" quiz mode,
+# a function of its sitelinks: "linear", "sqrt" or "log"
+QUIZ_POPULARITY_WEIGHT = env.str("QUIZ_POPULARITY_WEIGHT", default="sqrt")
+
+# Wikidata client used by the import commands
+WIKIDATA_API_URL = env.str(
+    "WIKIDATA_API_URL", default="https://www.wikidata.org/w/api.php"
+)
+WIKIDATA_SPARQL_URL = env.str(
+    "WIKIDATA_SPARQL_URL", default="https://query.wikidata.org/sparql"
+)
+# https://meta.wikimedia.org/wiki/User-Agent_policy
+WIKIDATA_USER_AGENT = env.str(
+    "WIKIDATA_USER_AGENT",
+    default="movie-title-quiz/1.0 (https://github.com/aehmjott/movie-title-quiz)",
+)
+WIKIDATA_REQUESTS_PER_SECOND = env.float("WIKIDATA_REQUESTS_PER_SECOND", default=5.0)
+# Seconds to wait for a response
+WIKIDATA_TIMEOUT = env.float("WIKIDATA_TIMEOUT", default=60.0)
+WIKIDATA_MAX_RETRIES = env.int("WIKIDATA_MAX_RETRIES", default=5)
+# https://www.mediawiki.org/wiki/Manual:Maxlag_parameter
+WIKIDATA_MAXLAG = env.int("WIKIDATA_MAXLAG", default=5)
+
+# On-disk cache of Wikidata responses: "off", "cache", "record" or "replay"
+# (see ``movies.tasks.client.CACHE_MODES``)
+WIKIDATA_CACHE_MODE = env.str("WIKIDATA_CACHE_MODE", default="off")
+WIKIDATA_CACHE_DIR = env.str(
+    "WIKIDATA_CACHE_DIR", default=str(BASE_DIR / ".wikidata-cache")
+)
+# Seconds until a cached response is requested again (0: never)
+WIKIDATA_CACHE_TTL = env.int("WIKIDATA_CACHE_TTL", default=60 * 60 * 24 * 7)
+
+# Memory for translation models kept loaded by ``translate_movie_titles``
+# (one opus-mt model takes about 300 MB)
+TRANSLATION_MODEL_MEMORY_MB = env.int("TRANSLATION_MODEL_MEMORY_MB", default=2048)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
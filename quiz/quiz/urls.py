@@ -15,12 +15,17 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from .views import IndexView
+from .views import AsyncIndexView, IndexView
 
 urlpatterns = [
-    path("", IndexView.as_view(), name="index"),
+    path(
+        "",
+        (AsyncIndexView if settings.ASYNC_VIEWS else IndexView).as_view(),
+        name="index",
+    ),
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
 ]
@@ -1,29 +1,152 @@
+from collections.abc import AsyncIterator, Iterator
+
 from django import views
+from django.http import Http404
 from django.shortcuts import render
-from django.db.models import Count
 
-from movies.models import Movie, AlternativeMovieTitle
+from movies import cache
+from movies.languages import get_language_codes
+from movies.models import QuizQuestion, QuizQuestionLanguage
+from movies.sampling import is_popular_mode
+from users.seen import (
+    SeenMovies,
+    aload_seen_movies,
+    astore_seen_movies,
+    load_seen_movies,
+    store_seen_movies,
+)
+
+# Random draws per request to find a movie the player hasn't seen yet
+UNSEEN_QUESTION_TRIES = 8
+
+# Bump when ``QuizQuestion.to_dict`` changes: the cache outlives deployments
+# and older entries would lack the new fields
+QUESTION_CACHE_VERSION = 2
+
+
+def get_question(position: int) -> dict | None:
+    question = QuizQuestion.objects.at_position(position)
+    return None if question is None else question.to_dict()
+
+
+async def aget_question(position: int) -> dict | None:
+    question = await QuizQuestion.objects.aat_position(position)
+    return None if question is None else question.to_dict()
+
+
+def draw_positions(request, count: int) -> Iterator[int]:
+    language_codes = get_language_codes(request)
+    if language_codes is not None:
+        # Pool sizes once per request, then one lookup per draw,
+        # only drawn as far as needed
+        sizes = QuizQuestionLanguage.objects.pool_sizes(language_codes)
+        for _ in range(count):
+            query = QuizQuestionLanguage.objects.draw(sizes)
+            position = None if query is None else query.first()
+            if position is not None:
+                yield position
+    elif is_popular_mode(request):
+        yield from QuizQuestion.objects.weighted_random_positions(count)
+    else:
+        yield from QuizQuestion.objects.random_positions(count)
+
+
+async def adraw_positions(request, count: int) -> AsyncIterator[int]:
+    language_codes = get_language_codes(request)
+    if language_codes is not None:
+        sizes = await QuizQuestionLanguage.objects.apool_sizes(language_codes)
+        for _ in range(count):
+            query = QuizQuestionLanguage.objects.draw(sizes)
+            position = None if query is None else await query.afirst()
+            if position is not None:
+                yield position
+        return
+
+    if is_popular_mode(request):
+        positions = await QuizQuestion.objects.aweighted_random_positions(count)
+    else:
+        positions = await QuizQuestion.objects.arandom_positions(count)
+    for position in positions:
+        yield position
+
+
+def get_question_cache_name(position: int) -> str:
+    return f"question:v{QUESTION_CACHE_VERSION}:{position}"
+
+
+def get_unseen_question(request, seen: SeenMovies) -> dict | None:
+    """
+    Draw random questions until one is not in ``seen``.
+    Falls back to the last draw if the player has seen all of them.
+    """
+    question = None
+    for position in draw_positions(request, UNSEEN_QUESTION_TRIES):
+        question = cache.get_or_set(
+            get_question_cache_name(position), lambda: get_question(position)
+        )
+        if question is not None and question["movie"]["id"] not in seen:
+            break
+    return question
+
+
+async def aget_unseen_question(request, seen: SeenMovies) -> dict | None:
+    question = None
+    async for position in adraw_positions(request, UNSEEN_QUESTION_TRIES):
+        question = await cache.aget_or_set(
+            get_question_cache_name(position), lambda: aget_question(position)
+        )
+        if question is not None and question["movie"]["id"] not in seen:
+            break
+    return question
 
 
 class IndexView(views.View):
 
     def get(self, request):
 
-        # Get titles that differenciate enough from the english version
-        # but not too much to ensure a fair experience
-        titles = AlternativeMovieTitle.objects.filter(
-            translation_difference_ratio__gte=0.25,
-            translation_difference_ratio__lt=0.75,
-        )
+        # Pick a random question from the precomputed pool
+        # (see ``QuizQuestionManager.refresh``) that the player hasn't seen yet
+        seen = load_seen_movies(request)
+        question = get_unseen_question(request, seen)
+        if question is None:
+            raise Http404("No quiz questions available")
 
-        # Pick out a random movie from these titles
-        movie = titles.order_by("?").first().movie
+        # Nothing to write when the movie was already marked as seen
+        if seen.add(question["movie"]["id"]):
+            store_seen_movies(request, seen)
 
         # Pick up to 3 titles for the quiz
-        titles = titles.filter(movie=movie).order_by("?")[:3]
+        titles = QuizQuestion.sample_titles(
+            question["titles"], language_codes=get_language_codes(request)
+        )
+
+        return render(
+            request,
+            "index.html",
+            {"movie": question["movie"], "alternative_titles": titles},
+        )
+
+
+class AsyncIndexView(views.View):
+    """
+    Async version of ``IndexView`` for ASGI deployments
+    """
+
+    async def get(self, request):
+        seen = await aload_seen_movies(request)
+        question = await aget_unseen_question(request, seen)
+        if question is None:
+            raise Http404("No quiz questions available")
+
+        if seen.add(question["movie"]["id"]):
+            await astore_seen_movies(request, seen)
+
+        titles = QuizQuestion.sample_titles(
+            question["titles"], language_codes=get_language_codes(request)
+        )
 
         return render(
             request,
             "index.html",
-            {"movie": movie, "alternative_titles": titles},
+            {"movie": question["movie"], "alternative_titles": titles},
         )
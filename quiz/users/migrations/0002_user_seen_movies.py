@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 21:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='seen_movies',
+            field=models.BinaryField(default=bytes),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser
+from django.db import models
 
 
 class User(AbstractUser):
-    pass
\ No newline at end of file
+
+    # Serialized ``users.seen.SeenMovies`` Bloom filter
+    seen_movies = models.BinaryField(default=bytes)
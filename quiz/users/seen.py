@@ -0,0 +1,94 @@
+import hashlib
+import struct
+
+from .models import User
+
+# 4 KB bit array with 7 hash functions:
+# ~1% false positives after 3400 movies
+SEEN_FILTER_BITS = 4096 * 8
+SEEN_FILTER_HASHES = 7
+SEEN_FILTER_CAPACITY = 3400
+
+
+class SeenMovies:
+    """
+    Bloom filter of the movies a player has already seen.
+    A false positive only means that an unseen movie gets skipped.
+    The filter starts over once it reaches its capacity.
+    """
+
+    header = struct.Struct("<I")
+
+    def __init__(self, data: bytes = b""):
+        data = bytes(data)
+        if len(data) == self.header.size + SEEN_FILTER_BITS // 8:
+            (self.count,) = self.header.unpack_from(data)
+            self.bits = bytearray(data[self.header.size :])
+        else:
+            self.clear()
+
+    def clear(self) -> None:
+        self.count = 0
+        self.bits = bytearray(SEEN_FILTER_BITS // 8)
+
+    def get_bit_positions(self, movie_id: int):
+        digest = hashlib.blake2b(str(movie_id).encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        # Double hashing: h1 + i * h2
+        return (
+            (h1 + i * h2) % SEEN_FILTER_BITS for i in range(SEEN_FILTER_HASHES)
+        )
+
+    def __contains__(self, movie_id: int) -> bool:
+        return all(
+            self.bits[bit >> 3] & (1 << (bit & 7))
+            for bit in self.get_bit_positions(movie_id)
+        )
+
+    def add(self, movie_id: int) -> bool:
+        """
+        Return whether the filter changed
+        """
+        if movie_id in self:
+            return False
+        if self.count >= SEEN_FILTER_CAPACITY:
+            self.clear()
+        for bit in self.get_bit_positions(movie_id):
+            self.bits[bit >> 3] |= 1 << (bit & 7)
+        self.count += 1
+        return True
+
+    def to_bytes(self) -> bytes:
+        return self.header.pack(self.count) + bytes(self.bits)
+
+
+def load_seen_movies(request) -> SeenMovies:
+    """
+    Seen movies are only kept for logged-in players: a session per anonymous
+    page view would cost a database write of a few KB each time
+    """
+    if request.user.is_authenticated:
+        return SeenMovies(request.user.seen_movies)
+    return SeenMovies()
+
+
+def store_seen_movies(request, seen: SeenMovies) -> None:
+    if request.user.is_authenticated:
+        request.user.seen_movies = seen.to_bytes()
+        User.objects.filter(pk=request.user.pk).update(
+            seen_movies=request.user.seen_movies
+        )
+
+
+async def aload_seen_movies(request) -> SeenMovies:
+    user = await request.auser()
+    if user.is_authenticated:
+        return SeenMovies(user.seen_movies)
+    return SeenMovies()
+
+
+async def astore_seen_movies(request, seen: SeenMovies) -> None:
+    user = await request.auser()
+    if user.is_authenticated:
+        user.seen_movies = seen.to_bytes()
+        await User.objects.filter(pk=user.pk).aupdate(seen_movies=user.seen_movies)